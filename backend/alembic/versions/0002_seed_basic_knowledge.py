@@ -0,0 +1,91 @@
+"""seed basic laws, cases and practical docs
+
+Revision ID: 0002
+Revises: 
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# 初始数据与数据采集脚本共用 scripts/seeds 下的JSON文件，只保留一份数据源
+SEEDS_DIR = Path(__file__).resolve().parents[3] / "scripts" / "seeds"
+SEED_FILES = ("basic_laws", "cases", "practical_docs")
+
+
+def _load_seed_knowledge():
+    """加载基础法律条文、案例和实务文档"""
+    items = []
+    for name in SEED_FILES:
+        items.extend(json.loads((SEEDS_DIR / f"{name}.json").read_text(encoding="utf-8")))
+    return items
+
+
+# 本版本时的knowledge_base表结构。迁移不引用应用模型，避免模型后续变更改变本迁移的行为
+knowledge_table = sa.table(
+    "knowledge_base",
+    sa.column("id", sa.Integer),
+    sa.column("title", sa.String),
+    sa.column("content", sa.Text),
+    sa.column("category", sa.String),
+    sa.column("tags", sa.JSON),
+    sa.column("source", sa.String),
+    sa.column("version", sa.String),
+    sa.column("is_active", sa.Boolean),
+    sa.column("created_at", sa.DateTime),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    
+    # 新库可能尚未由 init_db 建表
+    if "knowledge_base" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "knowledge_base",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("category", sa.String(50)),
+            sa.Column("tags", sa.JSON()),
+            sa.Column("source", sa.String(100)),
+            sa.Column("version", sa.String(20)),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_knowledge_base_id", "knowledge_base", ["id"])
+    
+    # 幂等：只插入尚不存在的条目
+    seed_knowledge = _load_seed_knowledge()
+    titles = [item["title"] for item in seed_knowledge]
+    existing = set(bind.execute(
+        sa.select(knowledge_table.c.title).where(knowledge_table.c.title.in_(titles))
+    ).scalars())
+    
+    # 冻结的表结构没有模型上的默认值，这里显式填写
+    now = datetime.utcnow()
+    rows = [
+        dict(item, is_active=True, created_at=now, updated_at=now)
+        for item in seed_knowledge if item["title"] not in existing
+    ]
+    if rows:
+        op.bulk_insert(knowledge_table, rows)
+
+
+def downgrade() -> None:
+    titles = [item["title"] for item in _load_seed_knowledge()]
+    op.execute(knowledge_table.delete().where(knowledge_table.c.title.in_(titles)))
@@ -0,0 +1,74 @@
+"""add knowledge_base.search_tokens for Chinese full-text search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+# 本版本时用到的knowledge_base列，迁移不引用应用模型
+knowledge_table = sa.table(
+    "knowledge_base",
+    sa.column("id", sa.Integer),
+    sa.column("title", sa.String),
+    sa.column("content", sa.Text),
+    sa.column("search_tokens", sa.Text),
+)
+
+
+def _segment(text: str) -> str:
+    """与 app.database.segment_for_search 相同的分词规则"""
+    import jieba
+    return " ".join(word for word in jieba.cut(text or "") if word.strip())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    # 新库由 init_db 的 create_all 直接建表，这里只处理已有的表
+    if "knowledge_base" not in inspector.get_table_names():
+        return
+    columns = {column["name"] for column in inspector.get_columns("knowledge_base")}
+    if "search_tokens" not in columns:
+        op.add_column("knowledge_base", sa.Column("search_tokens", sa.Text(), nullable=True))
+    
+    # 为已有条目补充分词结果
+    rows = bind.execute(
+        sa.select(knowledge_table.c.id, knowledge_table.c.title, knowledge_table.c.content)
+        .where(knowledge_table.c.search_tokens.is_(None))
+    ).all()
+    for row in rows:
+        bind.execute(
+            knowledge_table.update()
+            .where(knowledge_table.c.id == row.id)
+            .values(search_tokens=_segment(f"{row.title or ''} {row.content or ''}"))
+        )
+    
+    # PostgreSQL: 全文索引改为建在分词列上
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_kb_tsv")
+        op.execute(
+            "CREATE INDEX ix_kb_tsv ON knowledge_base "
+            "USING gin (to_tsvector('simple', coalesce(search_tokens, '')))"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_kb_tsv")
+        op.execute(
+            "CREATE INDEX ix_kb_tsv ON knowledge_base "
+            "USING gin (to_tsvector('simple', title || ' ' || content))"
+        )
+    op.drop_column("knowledge_base", "search_tokens")
@@ -0,0 +1,33 @@
+"""add users.must_change_password for seed accounts hashed at low cost
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # 新库由 init_db 的 create_all 直接建表，这里只处理已有的表
+    if "users" not in inspector.get_table_names():
+        return
+    columns = {column["name"] for column in inspector.get_columns("users")}
+    if "must_change_password" not in columns:
+        op.add_column(
+            "users",
+            sa.Column("must_change_password", sa.Boolean(), nullable=False, server_default=sa.false()),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "must_change_password")
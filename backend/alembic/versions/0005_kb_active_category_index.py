@@ -0,0 +1,37 @@
+"""add partial index knowledge_base(category) WHERE is_active
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # 新库由 init_db 的 create_all 直接建表（含索引），这里只处理已有的表
+    if "knowledge_base" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("knowledge_base")}
+    if "ix_kb_active_category" not in indexes:
+        # 分类统计使用的部分索引，只覆盖有效条目
+        op.create_index(
+            "ix_kb_active_category",
+            "knowledge_base",
+            ["category"],
+            postgresql_where=sa.text("is_active = true"),
+            sqlite_where=sa.text("is_active = 1"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_kb_active_category", table_name="knowledge_base")
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     # 数据库配置 - MongoDB版本
     MONGODB_URL: str = "mongodb://localhost:27017"  # MongoDB连接URL
     MONGODB_DATABASE: str = "law_ai_db"  # MongoDB数据库名
+    MONGODB_MIN_POOL_SIZE: int = 8  # MongoDB连接池预建连接数
+    MONGODB_MAX_POOL_SIZE: int = 32  # MongoDB连接池最大连接数
     # 保留SQLite作为备用
     DATABASE_URL: str = "sqlite:///./law_ai.db"
     REDIS_URL: str = "redis://localhost:6379"
@@ -6,20 +6,37 @@ from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from cachetools import TTLCache
+import hashlib
 import secrets
+import threading
+import time
 
 from .config import settings
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# 已验证令牌的载荷缓存，同一令牌在有效期内不重复验签
+# 以令牌摘要为键，内存中不保留原始令牌
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=300)
+_token_cache_lock = threading.RLock()
+
+# 已登出令牌的黑名单：令牌摘要 -> 过期时间，保留到令牌自身过期为止，验签前检查
+_revoked_tokens: Dict[bytes, float] = {}
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """生成密码哈希"""
-    return pwd_context.hash(password)
+def get_password_hash(password: str, *, rounds: Optional[int] = None) -> str:
+    """生成密码哈希，rounds为空时使用bcrypt默认成本"""
+    if rounds is None:
+        return pwd_context.hash(password)
+    return pwd_context.using(rounds=rounds).hash(password)
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
@@ -35,11 +52,42 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """验证令牌"""
+    key = _token_cache_key(token)
+    with _token_cache_lock:
+        if key in _revoked_tokens:
+            return None
+        payload = _token_cache.get(key)
+    if payload is not None:
+        # 缓存有效期可能长于令牌本身，命中时仍检查过期时间
+        if payload.get("exp", float("inf")) > time.time():
+            return payload
+        with _token_cache_lock:
+            _token_cache.pop(key, None)
+        return None
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
+
+def revoke_token(token: str) -> None:
+    """吊销令牌（登出时调用）：加入黑名单直至令牌过期，并移出验证缓存"""
+    payload = verify_token(token)
+    if payload is None:
+        # 无效或已过期的令牌本身就无法通过验证
+        return
+    now = time.time()
+    key = _token_cache_key(token)
+    with _token_cache_lock:
+        # 顺带清理已过期的黑名单条目，黑名单大小不超过有效期内的登出次数
+        for expired in [k for k, exp in _revoked_tokens.items() if exp <= now]:
+            del _revoked_tokens[expired]
+        _revoked_tokens[key] = payload.get("exp", now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        _token_cache.pop(key, None)
 
 def generate_api_key() -> str:
     """生成API密钥"""
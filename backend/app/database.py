@@ -1,15 +1,20 @@
 """
 数据库连接和模型定义
 """
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 import redis
+import orjson
 from contextlib import asynccontextmanager
 
 from .core.config import settings
 
+def _json_serializer(obj) -> str:
+    """JSON列序列化使用orjson，列存储为文本，需解码为str"""
+    return orjson.dumps(obj).decode()
+
 # 创建数据库引擎 - 仅在使用SQLAlchemy时创建
 engine = None
 SessionLocal = None
@@ -21,13 +26,28 @@ if hasattr(settings, 'DATABASE_URL') and settings.DATABASE_URL:
         engine = create_engine(
             settings.DATABASE_URL,
             poolclass=StaticPool,
-            connect_args={"check_same_thread": False}
+            connect_args={"check_same_thread": False},
+            json_serializer=_json_serializer,
+            json_deserializer=orjson.loads
         )
+        
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            """每个新连接设置SQLite PRAGMA：WAL日志、减少fsync、临时表放内存"""
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")
+            cursor.execute("PRAGMA cache_size=-65536")
+            cursor.close()
     elif "postgresql" in settings.DATABASE_URL:
         # PostgreSQL配置
         engine = create_engine(
             settings.DATABASE_URL,
-            poolclass=StaticPool
+            poolclass=StaticPool,
+            json_serializer=_json_serializer,
+            json_deserializer=orjson.loads
         )
     
     if engine:
@@ -71,7 +91,7 @@ def get_redis():
     return redis_client
 
 # 数据库模型
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON, Index, func, inspect
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -86,6 +106,7 @@ class User(Base):
     full_name = Column(String(100))
     role = Column(String(20), default="user")  # user, admin, lawyer, enterprise
     is_active = Column(Boolean, default=True)
+    must_change_password = Column(Boolean, default=False)  # 初始化脚本以低成本哈希创建的账号，首次登录需修改密码
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -125,6 +146,16 @@ class LegalCase(Base):
     # 关系
     user = relationship("User", back_populates="cases")
 
+def segment_for_search(text: str) -> str:
+    """jieba分词后以空格连接，供PostgreSQL的simple解析器按词建立全文索引"""
+    import jieba
+    return " ".join(word for word in jieba.cut(text or "") if word.strip())
+
+def _knowledge_search_tokens(context) -> str:
+    """插入时由标题和正文生成分词列（Core批量插入同样生效）"""
+    params = context.get_current_parameters()
+    return segment_for_search(f"{params.get('title') or ''} {params.get('content') or ''}")
+
 class KnowledgeBase(Base):
     """法律知识库"""
     __tablename__ = "knowledge_base"
@@ -136,10 +167,33 @@ class KnowledgeBase(Base):
     tags = Column(JSON)  # 标签列表
     source = Column(String(100))  # 来源
     version = Column(String(20), default="1.0")
+    search_tokens = Column(Text, default=_knowledge_search_tokens)  # 标题和正文的jieba分词结果，空格分隔，用于全文检索
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+@event.listens_for(KnowledgeBase, "before_update")
+def _refresh_knowledge_search_tokens(mapper, connection, target):
+    """通过ORM修改标题或正文时重新分词"""
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.content.history.has_changes():
+        target.search_tokens = segment_for_search(f"{target.title or ''} {target.content or ''}")
+
+# PostgreSQL全文检索表达式，查询时必须使用同一表达式才能命中GIN索引。
+# simple解析器不会切分连续的中文字符，因此索引预先分好词的 search_tokens 列
+knowledge_tsvector = func.to_tsvector("simple", func.coalesce(KnowledgeBase.search_tokens, ""))
+
+# GIN索引仅在PostgreSQL上创建，SQLite开发环境跳过
+Index("ix_kb_tsv", knowledge_tsvector, postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# 分类统计使用的部分索引，只覆盖有效条目
+Index(
+    "ix_kb_active_category",
+    KnowledgeBase.category,
+    postgresql_where=KnowledgeBase.is_active == True,
+    sqlite_where=KnowledgeBase.is_active == True
+)
+
 class EcosystemPartner(Base):
     """生态合作伙伴"""
     __tablename__ = "ecosystem_partners"
@@ -28,7 +28,11 @@ class MongoDBManager:
             )
             
             # 异步连接（用于Motor）
-            self.client = AsyncIOMotorClient(settings.MONGODB_URL)
+            self.client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE
+            )
             self.database = self.client[settings.MONGODB_DATABASE]
             
             # 测试连接
@@ -56,13 +60,38 @@ class MongoDBManager:
     async def create_indexes(self):
         """创建索引"""
         try:
-            # 为知识库创建文本搜索索引
+            # 为知识库创建文本搜索索引（中文内容，关闭词干处理；只索引有效条目）
+            # 每个集合只能有一个文本索引，先删除旧定义的文本索引
+            index_info = await self.database.knowledge_base.index_information()
+            for name, info in index_info.items():
+                if name != "kb_text" and any(kind == "text" for _, kind in info["key"]):
+                    await self.database.knowledge_base.drop_index(name)
+            await self.database.knowledge_base.create_index(
+                [("title", "text"), ("content", "text"), ("tags", "text")],
+                name="kb_text",
+                default_language="none",
+                weights={"title": 10, "tags": 5, "content": 1},
+                partialFilterExpression={"is_active": True}
+            )
+            
+            # 为知识库的分类、热门、标签查询创建复合索引
+            await self.database.knowledge_base.create_index([
+                ("is_active", 1),
+                ("category", 1)
+            ])
+            await self.database.knowledge_base.create_index([
+                ("is_active", 1),
+                ("view_count", -1)
+            ])
             await self.database.knowledge_base.create_index([
-                ("title", "text"),
-                ("content", "text"),
-                ("tags", "text")
+                ("tags", 1),
+                ("is_active", 1)
             ])
             
+            # 用户名、邮箱唯一索引（与模型字段的unique约束一致），初始化脚本绕过MongoEngine直接写入时也能拦截重复
+            await self.database.users.create_index([("username", 1)], unique=True)
+            await self.database.users.create_index([("email", 1)], unique=True)
+            
             # 为咨询记录创建复合索引
             await self.database.legal_consultations.create_index([
                 ("user_id", 1),
@@ -22,6 +22,7 @@ class User(Document):
     full_name = StringField(max_length=100)
     role = StringField(choices=['user', 'admin', 'lawyer', 'enterprise'], default='user')
     is_active = BooleanField(default=True)
+    must_change_password = BooleanField(default=False)  # 初始化脚本以低成本哈希创建的账号，首次登录需修改密码
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
     
@@ -100,7 +101,16 @@ class KnowledgeBase(Document):
             'tags',
             'is_active',
             'created_at',
-            [('title', 'text'), ('content', 'text')]  # 文本搜索索引
+            ('is_active', 'category'),
+            ('is_active', '-view_count'),
+            ('tags', 'is_active'),
+            {  # 文本搜索索引（中文内容，关闭词干处理；只索引有效条目）
+                'fields': ['$title', '$content', '$tags'],
+                'name': 'kb_text',
+                'default_language': 'none',
+                'weights': {'title': 10, 'tags': 5, 'content': 1},
+                'partialFilterExpression': {'is_active': True}
+            }
         ]
     }
 
@@ -3,18 +3,17 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from ..database import get_db
 from ..models.mongodb_models import User
 from ..core.security import (
     verify_password, 
     get_password_hash, 
     create_access_token,
-    verify_token
+    verify_token,
+    revoke_token
 )
 from ..core.config import settings
 
@@ -45,13 +44,18 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class PasswordChange(BaseModel):
+    username: str
+    old_password: str
+    new_password: str
+
 class Token(BaseModel):
     access_token: str
     token_type: str
     expires_in: int
 
 class UserResponse(BaseModel):
-    id: int
+    id: str
     username: str
     email: str
     full_name: Optional[str]
@@ -59,13 +63,10 @@ class UserResponse(BaseModel):
     is_active: bool
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(
-    user_data: UserCreate,
-    db: Session = Depends(get_db)
-):
+async def register_user(user_data: UserCreate):
     """用户注册"""
     # 检查用户名是否已存在
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = User.objects(username=user_data.username).only("id").first()
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -73,7 +74,7 @@ async def register_user(
         )
     
     # 检查邮箱是否已存在
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = User.objects(email=user_data.email).only("id").first()
     if existing_email:
         raise HTTPException(
             status_code=400,
@@ -90,12 +91,10 @@ async def register_user(
         role=user_data.role
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    new_user.save()
     
     return UserResponse(
-        id=new_user.id,
+        id=str(new_user.id),
         username=new_user.username,
         email=new_user.email,
         full_name=new_user.full_name,
@@ -122,6 +121,13 @@ async def login_user(login_data: UserLogin):
             detail="账户已被禁用"
         )
     
+    # 初始化脚本以低成本哈希创建的账号，修改密码前不签发令牌
+    if user.must_change_password:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="首次登录需修改密码，请调用 /change-password"
+        )
+    
     # 创建访问令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -135,6 +141,31 @@ async def login_user(login_data: UserLogin):
         expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     )
 
+@router.post("/change-password")
+async def change_password(password_data: PasswordChange):
+    """修改密码（使用默认成本重新哈希，并清除首次登录修改密码标记）"""
+    user = User.objects(username=password_data.username).first()
+    
+    if not user or not verify_password(password_data.old_password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户名或密码错误",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if password_data.new_password == password_data.old_password:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="新密码不能与原密码相同"
+        )
+    
+    user.hashed_password = get_password_hash(password_data.new_password)
+    user.must_change_password = False
+    user.updated_at = datetime.utcnow()
+    user.save()
+    
+    return {"message": "密码修改成功"}
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """获取当前用户信息"""
@@ -174,8 +205,9 @@ async def refresh_token(
     )
 
 @router.post("/logout")
-async def logout_user():
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """用户登出"""
     # 在实际应用中，这里可以将令牌加入黑名单
+    revoke_token(credentials.credentials)
     return {"message": "登出成功"}
 
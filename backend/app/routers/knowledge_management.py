@@ -47,16 +47,12 @@ class KnowledgeSearchResponse(BaseModel):
 async def build_knowledge_base(
     request: KnowledgeBuildRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """构建法律知识库"""
     try:
-        # 异步构建知识库
-        background_tasks.add_task(
-            knowledge_builder.build_knowledge_base,
-            db
-        )
+        # 异步构建知识库，各阶段自行创建数据库会话
+        background_tasks.add_task(knowledge_builder.build_knowledge_base)
         
         return {
             "success": True,
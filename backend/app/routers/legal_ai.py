@@ -3,6 +3,7 @@
 提供智能法律咨询和分析功能
 """
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -101,6 +102,26 @@ async def legal_consultation(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"法律咨询处理失败: {str(e)}")
 
+@router.post("/consult/stream")
+async def legal_consultation_stream(
+    request: LegalQuestionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """流式法律咨询接口 - 与其他接口共用同一个 LawLLM 服务实例，逐步返回生成内容"""
+    try:
+        lawllm_service = get_lawllm_service()
+        
+        return StreamingResponse(
+            lawllm_service.stream_consultation(
+                question=request.question,
+                context=request.context
+            ),
+            media_type="text/plain; charset=utf-8"
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"流式法律咨询失败: {str(e)}")
+
 @router.post("/analyze", response_model=LegalAnalysisResponse)
 async def legal_analysis(
     request: LegalAnalysisRequest,
@@ -157,7 +178,7 @@ async def batch_consultation(
         lawllm_service = get_lawllm_service()
         
         # 使用 LawLLM-7B 进行批量咨询
-        lawllm_responses = lawllm_service.batch_consultation(request.questions)
+        lawllm_responses = await lawllm_service.batch_consultation(request.questions)
         
         results = []
         for i, response in enumerate(lawllm_responses):
@@ -3,7 +3,10 @@
 实现知识采集、处理、存储和检索的完整流程
 """
 import os
+import re
 import json
+import time
+import asyncio
 import hashlib
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -11,13 +14,23 @@ import requests
 from bs4 import BeautifulSoup
 import PyPDF2
 from docx import Document as DocxDocument
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from ..database import KnowledgeBase, get_db
+from ..database import KnowledgeBase, SessionLocal, knowledge_tsvector, segment_for_search, get_db
 from ..core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 标签提取使用的法律关键词
+LEGAL_KEYWORDS = [
+    "合同", "侵权", "婚姻", "继承", "劳动", "刑事", "行政",
+    "民事", "商事", "知识产权", "环境", "金融", "房地产"
+]
+
+# 一次扫描匹配全部关键词；零宽前瞻保证重叠出现的关键词也能被计入
+_TAG_RE = re.compile("(?=(" + "|".join(map(re.escape, LEGAL_KEYWORDS)) + "))")
+
 class LegalKnowledgeBuilder:
     """法律知识库构建器"""
     
@@ -25,20 +38,18 @@ class LegalKnowledgeBuilder:
         self.knowledge_base_path = settings.KNOWLEDGE_BASE_PATH
         self.supported_formats = ['.txt', '.pdf', '.docx', '.html']
         
-    async def build_knowledge_base(self, db: Session):
+        # 统计信息缓存（统计无需实时，短TTL即可）
+        self.stats_cache_ttl = 60
+        self._stats_cache = None
+        self._stats_cached_at = 0.0
+        
+    async def build_knowledge_base(self):
         """构建完整的法律知识库"""
         try:
-            # 1. 初始化基础法律条文
-            await self._init_basic_laws(db)
-            
-            # 2. 采集案例数据
-            await self._collect_legal_cases(db)
-            
-            # 3. 处理实务文档
-            await self._process_practical_docs(db)
-            
-            # 4. 建立知识关联
-            await self._build_knowledge_relations(db)
+            # 基础法律条文、案例和实务文档由 alembic 数据迁移 0002 一次性写入，
+            # 这里只执行动态阶段；数据库操作放到线程中执行，避免阻塞事件循环
+            # 建立知识关联
+            await asyncio.to_thread(self._run_in_session, self._build_knowledge_relations)
             
             logger.info("法律知识库构建完成")
             return True
@@ -47,145 +58,27 @@ class LegalKnowledgeBuilder:
             logger.error(f"知识库构建失败: {e}")
             return False
     
-    async def _init_basic_laws(self, db: Session):
-        """初始化基础法律条文"""
-        basic_laws = [
-            {
-                "title": "中华人民共和国民法典",
-                "content": "民法典是民事法律的基础，规定了民事主体的权利义务关系...",
-                "category": "civil_law",
-                "tags": ["民法典", "民事法律", "基础法律"],
-                "source": "全国人大",
-                "version": "2021.1.1"
-            },
-            {
-                "title": "中华人民共和国刑法",
-                "content": "刑法规定了犯罪和刑罚的基本制度，是刑事法律的核心...",
-                "category": "criminal_law", 
-                "tags": ["刑法", "刑事法律", "犯罪"],
-                "source": "全国人大",
-                "version": "2021.3.1"
-            },
-            {
-                "title": "中华人民共和国行政诉讼法",
-                "content": "行政诉讼法规定了行政诉讼的基本程序和要求...",
-                "category": "administrative_law",
-                "tags": ["行政法", "行政诉讼", "程序法"],
-                "source": "全国人大",
-                "version": "2017.7.1"
-            }
-        ]
-        
-        for law in basic_laws:
-            # 检查是否已存在
-            existing = db.query(KnowledgeBase).filter(
-                KnowledgeBase.title == law["title"]
-            ).first()
-            
-            if not existing:
-                knowledge_item = KnowledgeBase(
-                    title=law["title"],
-                    content=law["content"],
-                    category=law["category"],
-                    tags=law["tags"],
-                    source=law["source"],
-                    version=law["version"]
-                )
-                db.add(knowledge_item)
-        
-        db.commit()
-        logger.info("基础法律条文初始化完成")
-    
-    async def _collect_legal_cases(self, db: Session):
-        """采集法律案例数据"""
-        # 模拟案例数据采集
-        cases = [
-            {
-                "title": "合同纠纷典型案例",
-                "content": "某公司与供应商签订采购合同，因质量问题产生纠纷...",
-                "category": "civil_law",
-                "tags": ["合同纠纷", "典型案例", "民事纠纷"],
-                "source": "最高人民法院",
-                "version": "2023.1"
-            },
-            {
-                "title": "劳动争议处理案例",
-                "content": "员工与用人单位因工资支付问题产生争议...",
-                "category": "labor_law",
-                "tags": ["劳动争议", "工资支付", "劳动法"],
-                "source": "劳动仲裁委员会",
-                "version": "2023.2"
-            }
-        ]
-        
-        for case in cases:
-            existing = db.query(KnowledgeBase).filter(
-                KnowledgeBase.title == case["title"]
-            ).first()
-            
-            if not existing:
-                knowledge_item = KnowledgeBase(
-                    title=case["title"],
-                    content=case["content"],
-                    category=case["category"],
-                    tags=case["tags"],
-                    source=case["source"],
-                    version=case["version"]
-                )
-                db.add(knowledge_item)
-        
-        db.commit()
-        logger.info("法律案例采集完成")
-    
-    async def _process_practical_docs(self, db: Session):
-        """处理实务文档"""
-        # 实务文档模板
-        practical_docs = [
-            {
-                "title": "合同审查要点",
-                "content": "合同审查是法律实务中的重要环节，需要注意以下要点...",
-                "category": "commercial_law",
-                "tags": ["合同审查", "实务指南", "商业法律"],
-                "source": "律师事务所",
-                "version": "2023.1"
-            },
-            {
-                "title": "劳动争议处理流程",
-                "content": "劳动争议处理需要按照法定程序进行，具体流程如下...",
-                "category": "labor_law",
-                "tags": ["劳动争议", "处理流程", "劳动法"],
-                "source": "劳动法律师",
-                "version": "2023.1"
-            }
-        ]
-        
-        for doc in practical_docs:
-            existing = db.query(KnowledgeBase).filter(
-                KnowledgeBase.title == doc["title"]
-            ).first()
-            
-            if not existing:
-                knowledge_item = KnowledgeBase(
-                    title=doc["title"],
-                    content=doc["content"],
-                    category=doc["category"],
-                    tags=doc["tags"],
-                    source=doc["source"],
-                    version=doc["version"]
-                )
-                db.add(knowledge_item)
-        
-        db.commit()
-        logger.info("实务文档处理完成")
+    def _run_in_session(self, stage, *args):
+        """在独立的短生命周期会话中执行同步阶段，会话不跨线程共享"""
+        db = SessionLocal()
+        try:
+            return stage(*args, db)
+        finally:
+            db.close()
     
-    async def _build_knowledge_relations(self, db: Session):
+    def _build_knowledge_relations(self, db: Session):
         """建立知识关联关系"""
         # 这里可以实现知识条目之间的关联关系
         # 例如：相关法条、相关案例、相关实务等
         logger.info("知识关联关系建立完成")
     
-    async def import_from_file(self, file_path: str, category: str, db: Session):
+    async def import_from_file(self, file_path: str, category: str):
         """从文件导入知识"""
+        # 文件解析和入库均为阻塞操作，放到线程中执行
+        return await asyncio.to_thread(self._run_in_session, self._import_file, file_path, category)
+    
+    def _import_file(self, file_path: str, category: str, db: Session) -> bool:
+        """解析文件并写入知识库"""
         try:
             file_ext = os.path.splitext(file_path)[1].lower()
             
@@ -226,35 +119,21 @@ class LegalKnowledgeBuilder:
     
     def _extract_from_pdf(self, file_path: str) -> str:
         """从PDF文件提取内容"""
-        content = ""
+        # 逐页收集后一次拼接，避免大文件反复分配字符串
         with open(file_path, 'rb') as f:
             pdf_reader = PyPDF2.PdfReader(f)
-            for page in pdf_reader.pages:
-                content += page.extract_text()
-        return content
+            return "".join(page.extract_text() for page in pdf_reader.pages)
     
     def _extract_from_docx(self, file_path: str) -> str:
         """从DOCX文件提取内容"""
         doc = DocxDocument(file_path)
-        content = ""
-        for paragraph in doc.paragraphs:
-            content += paragraph.text + "\n"
-        return content
+        return "".join(paragraph.text + "\n" for paragraph in doc.paragraphs)
     
     def _extract_tags(self, content: str) -> List[str]:
         """从内容中提取标签"""
-        # 简化的标签提取逻辑
-        legal_keywords = [
-            "合同", "侵权", "婚姻", "继承", "劳动", "刑事", "行政",
-            "民事", "商事", "知识产权", "环境", "金融", "房地产"
-        ]
-        
-        tags = []
-        for keyword in legal_keywords:
-            if keyword in content:
-                tags.append(keyword)
-        
-        return tags
+        # 简化的标签提取逻辑：单次正则扫描，按关键词表顺序输出
+        found = set(_TAG_RE.findall(content))
+        return [keyword for keyword in LEGAL_KEYWORDS if keyword in found]
     
     async def search_knowledge(self, query: str, category: str = None, db: Session = None):
         """搜索知识库"""
@@ -267,11 +146,20 @@ class LegalKnowledgeBuilder:
             if category:
                 search_query = search_query.filter(KnowledgeBase.category == category)
             
-            # 简单的文本搜索
-            results = search_query.filter(
-                KnowledgeBase.title.contains(query) |
-                KnowledgeBase.content.contains(query)
-            ).all()
+            if db.bind.dialect.name == "postgresql":
+                # PostgreSQL: 走GIN全文索引，查询与索引列使用同一种jieba分词
+                terms = segment_for_search(query)
+                search_query = search_query.filter(
+                    knowledge_tsvector.op("@@")(func.plainto_tsquery("simple", terms))
+                )
+            else:
+                # SQLite等开发环境: 回退到简单的文本搜索
+                search_query = search_query.filter(
+                    KnowledgeBase.title.contains(query) |
+                    KnowledgeBase.content.contains(query)
+                )
+            
+            results = search_query.all()
             
             return results
             
@@ -281,25 +169,24 @@ class LegalKnowledgeBuilder:
     
     async def get_knowledge_stats(self, db: Session):
         """获取知识库统计信息"""
+        if self._stats_cache is not None and time.monotonic() - self._stats_cached_at < self.stats_cache_ttl:
+            return self._stats_cache
+        
         try:
-            total_count = db.query(KnowledgeBase).filter(KnowledgeBase.is_active == True).count()
-            
-            # 按分类统计
-            category_stats = {}
-            categories = db.query(KnowledgeBase.category).distinct().all()
+            # 按分类统计，一次GROUP BY查询
+            rows = db.query(KnowledgeBase.category, func.count(KnowledgeBase.id)).filter(
+                KnowledgeBase.is_active == True
+            ).group_by(KnowledgeBase.category).all()
             
-            for category in categories:
-                count = db.query(KnowledgeBase).filter(
-                    KnowledgeBase.category == category[0],
-                    KnowledgeBase.is_active == True
-                ).count()
-                category_stats[category[0]] = count
+            category_stats = {category: count for category, count in rows}
             
-            return {
-                "total_count": total_count,
+            self._stats_cache = {
+                "total_count": sum(category_stats.values()),
                 "category_stats": category_stats,
                 "last_updated": datetime.utcnow().isoformat()
             }
+            self._stats_cached_at = time.monotonic()
+            return self._stats_cache
             
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
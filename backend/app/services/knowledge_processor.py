@@ -3,6 +3,7 @@
 对采集的法律数据进行清洗、标准化和结构化处理
 """
 import re
+import bisect
 import jieba
 import jieba.posseg as pseg
 from typing import List, Dict, Any, Optional, Tuple
@@ -13,6 +14,22 @@ import hashlib
 
 logger = logging.getLogger(__name__)
 
+# 停用词表
+_STOP_WORDS = frozenset({
+    "的", "了", "在", "是", "我", "有", "和", "就", "不", "人", "都", "一", "一个",
+    "上", "也", "很", "到", "说", "要", "去", "你", "会", "着", "没有", "看", "好",
+    "自己", "这", "那", "里", "来", "下", "过", "他", "她", "它", "们", "我们",
+    "你们", "他们", "这个", "那个", "这些", "那些", "什么", "怎么", "为什么",
+    "因为", "所以", "但是", "然后", "如果", "虽然", "而且", "或者", "还是"
+})
+
+# 词性到实体类型的映射：人名、地名、机构名
+POS_ENTITY_TYPES = {
+    'nr': 'person',
+    'ns': 'location',
+    'nt': 'organization'
+}
+
 class LegalKnowledgeProcessor:
     """法律知识处理器"""
     
@@ -87,6 +104,9 @@ class LegalKnowledgeProcessor:
         """提取法律条文"""
         articles = []
         
+        # 预先记录全部句号位置，各条文共用
+        periods = [i for i, char in enumerate(content) if char == '。']
+        
         for pattern in self.law_patterns:
             matches = re.finditer(pattern, content)
             for match in matches:
@@ -95,7 +115,7 @@ class LegalKnowledgeProcessor:
                 end_pos = match.end()
                 
                 # 提取条文内容
-                article_content = self._extract_article_content(content, start_pos, end_pos)
+                article_content = self._extract_article_content(content, start_pos, end_pos, periods)
                 
                 articles.append({
                     "article_text": article_text,
@@ -106,14 +126,19 @@ class LegalKnowledgeProcessor:
         
         return articles
     
-    def _extract_article_content(self, content: str, start_pos: int, end_pos: int) -> str:
+    def _extract_article_content(self, content: str, start_pos: int, end_pos: int,
+                                 periods: Optional[List[int]] = None) -> str:
         """提取条文内容"""
         # 从条文开始位置向后查找，直到遇到下一个条文或段落结束
         content_start = end_pos
         content_end = content_start + 200  # 限制长度
         
-        # 查找句子结束位置
-        sentence_end = content.find('。', content_start, content_end)
+        # 查找句子结束位置，有句号位置表时二分查找
+        if periods is None:
+            sentence_end = content.find('。', content_start, content_end)
+        else:
+            idx = bisect.bisect_left(periods, content_start)
+            sentence_end = periods[idx] if idx < len(periods) and periods[idx] < content_end else -1
         if sentence_end != -1:
             content_end = sentence_end + 1
         
@@ -136,17 +161,11 @@ class LegalKnowledgeProcessor:
     
     def _extract_keywords(self, content: str) -> List[Dict[str, Any]]:
         """提取关键词"""
-        # 使用jieba分词
-        words = jieba.lcut(content)
-        
-        # 过滤停用词和短词
-        filtered_words = [
-            word for word in words 
-            if len(word) > 1 and word not in self._get_stop_words()
-        ]
-        
-        # 统计词频
-        word_freq = Counter(filtered_words)
+        # 使用jieba分词，过滤停用词和短词后直接统计词频
+        word_freq = Counter(
+            word for word in jieba.cut(content)
+            if len(word) > 1 and word not in _STOP_WORDS
+        )
         
         # 提取关键词
         keywords = []
@@ -159,15 +178,9 @@ class LegalKnowledgeProcessor:
         
         return keywords
     
-    def _get_stop_words(self) -> set:
+    def _get_stop_words(self) -> frozenset:
         """获取停用词列表"""
-        return {
-            "的", "了", "在", "是", "我", "有", "和", "就", "不", "人", "都", "一", "一个",
-            "上", "也", "很", "到", "说", "要", "去", "你", "会", "着", "没有", "看", "好",
-            "自己", "这", "那", "里", "来", "下", "过", "他", "她", "它", "们", "我们",
-            "你们", "他们", "这个", "那个", "这些", "那些", "什么", "怎么", "为什么",
-            "因为", "所以", "但是", "然后", "如果", "虽然", "而且", "或者", "还是"
-        }
+        return _STOP_WORDS
     
     def _classify_content(self, content: str) -> List[str]:
         """分类内容标签"""
@@ -216,27 +229,23 @@ class LegalKnowledgeProcessor:
         """提取实体"""
         entities = []
         
-        # 使用jieba进行词性标注
-        words = pseg.cut(content)
-        
-        for word, flag in words:
-            if flag in ['nr', 'ns', 'nt']:  # 人名、地名、机构名
+        # 使用jieba进行词性标注，分词结果按原文顺序产出，累加词长即可得到位置
+        offset = 0
+        for word, flag in pseg.cut(content):
+            entity_type = POS_ENTITY_TYPES.get(flag)
+            if entity_type is not None:
                 entities.append({
                     "text": word,
-                    "type": self._map_pos_to_entity_type(flag),
-                    "position": content.find(word)
+                    "type": entity_type,
+                    "position": offset
                 })
+            offset += len(word)
         
         return entities
     
     def _map_pos_to_entity_type(self, pos: str) -> str:
         """映射词性到实体类型"""
-        mapping = {
-            'nr': 'person',
-            'ns': 'location', 
-            'nt': 'organization'
-        }
-        return mapping.get(pos, 'other')
+        return POS_ENTITY_TYPES.get(pos, 'other')
     
     def _extract_dates(self, content: str) -> List[str]:
         """提取日期"""
@@ -313,17 +322,15 @@ class LegalKnowledgeProcessor:
     def calculate_similarity(self, content1: str, content2: str) -> float:
         """计算内容相似度"""
         try:
-            # 简单的基于词汇重叠的相似度计算
-            words1 = set(jieba.lcut(content1))
-            words2 = set(jieba.lcut(content2))
-            
-            intersection = words1.intersection(words2)
-            union = words1.union(words2)
+            # 基于词汇重叠的精确Jaccard相似度
+            words1 = set(jieba.cut(content1))
+            words2 = set(jieba.cut(content2))
             
-            if len(union) == 0:
+            union = words1 | words2
+            if not union:
                 return 0.0
             
-            return len(intersection) / len(union)
+            return len(words1 & words2) / len(union)
             
         except Exception as e:
             logger.error(f"计算相似度失败: {e}")
@@ -4,12 +4,15 @@ LawLLM-7B 法律服务
 基于 ShengbinYue/LawLLM-7B 模型的法律智能服务
 """
 import os
+import re
 import sys
+import uuid
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 import torch
 from transformers import AutoTokenizer
-from vllm import LLM, SamplingParams
+from vllm import AsyncEngineArgs, AsyncLLMEngine, SamplingParams
 import json
 from datetime import datetime
 
@@ -17,16 +20,46 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 回复质量评估使用的法律关键词
+LEGAL_KEYWORDS = ["法律", "法规", "条文", "规定", "条款", "案例", "判决", "法院", "律师", "诉讼"]
+
+# 一次扫描匹配全部关键词；零宽前瞻保证重叠出现的关键词也能被计入
+_QUALITY_RE = re.compile("(?=(" + "|".join(map(re.escape, LEGAL_KEYWORDS)) + "))")
+
+# 默认系统提示词
+DEFAULT_SYSTEM_MESSAGE = "你是LawLLM，一个由复旦大学DISC实验室创造的法律助手。"
+
+# 预渲染聊天模板时代替用户输入的占位符
+_PROMPT_PLACEHOLDER = "<<LAWLLM_USER_PROMPT>>"
+
 class LawLLMService:
     """LawLLM-7B 法律服务类"""
     
-    def __init__(self, model_name: str = "ShengbinYue/LawLLM-7B"):
+    def __init__(self, model_name: str = "ShengbinYue/LawLLM-7B", quantization: Optional[str] = None):
         self.model_name = model_name
-        self.llm = None
+        # 量化方式（如 "awq"），需配合对应的量化权重使用
+        self.quantization = quantization
+        self.engine = None
         self.tokenizer = None
         self.sampling_params = None
+        # 默认系统提示词下聊天模板渲染结果的前后两段
+        self._chat_template_parts = None
         self.is_initialized = False
+        # 保证并发的首批请求只构建一次推理引擎；实例在导入时创建，
+        # Python 3.9 的 asyncio.Lock 会在构造时绑定事件循环，因此在首次使用时于运行中的循环上创建
+        self._init_lock = None
         
+    async def ensure_initialized(self):
+        """首次使用时在工作线程中初始化模型，不阻塞事件循环"""
+        if self.is_initialized:
+            return
+        # 创建锁与检查之间没有await，单个事件循环内不会重复创建
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if not self.is_initialized:
+                await asyncio.to_thread(self.initialize)
+    
     def initialize(self):
         """初始化模型"""
         try:
@@ -40,12 +73,27 @@ class LawLLMService:
                 max_tokens=4096
             )
             
-            # 初始化 LLM
-            self.llm = LLM(model=self.model_name)
+            # 初始化异步推理引擎，生成过程不阻塞事件循环
+            # 所有请求共享同一系统提示词，开启前缀缓存以复用其KV缓存
+            engine_args = AsyncEngineArgs(
+                model=self.model_name,
+                quantization=self.quantization,
+                dtype="float16",
+                enable_prefix_caching=True,
+                kv_cache_dtype="fp8_e5m2",
+                gpu_memory_utilization=0.9,
+                max_model_len=4096
+            )
+            self.engine = AsyncLLMEngine.from_engine_args(engine_args)
             
             # 初始化分词器
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
             
+            # 系统提示词固定，预先渲染一次模板，之后每次只需拼接用户输入
+            rendered = self._apply_chat_template(DEFAULT_SYSTEM_MESSAGE, _PROMPT_PLACEHOLDER)
+            if rendered.count(_PROMPT_PLACEHOLDER) == 1:
+                self._chat_template_parts = tuple(rendered.split(_PROMPT_PLACEHOLDER))
+            
             self.is_initialized = True
             logger.info("✅ LawLLM-7B 模型初始化完成")
             
@@ -53,50 +101,73 @@ class LawLLMService:
             logger.error(f"❌ 模型初始化失败: {e}")
             raise
     
-    def generate_response(self, prompt: str, system_message: str = None) -> str:
-        """生成法律咨询回复"""
-        if not self.is_initialized:
-            self.initialize()
+    def _build_chat_text(self, prompt: str, system_message: str = None) -> str:
+        """应用聊天模板构建模型输入"""
+        if system_message is None or system_message == DEFAULT_SYSTEM_MESSAGE:
+            if self._chat_template_parts is not None:
+                prefix, suffix = self._chat_template_parts
+                return prefix + prompt + suffix
+            system_message = DEFAULT_SYSTEM_MESSAGE
+        
+        return self._apply_chat_template(system_message, prompt)
+    
+    def _apply_chat_template(self, system_message: str, prompt: str) -> str:
+        """渲染聊天模板"""
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+        
+        return self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+    
+    async def stream_response(self, prompt: str, system_message: str = None) -> AsyncIterator[str]:
+        """流式生成回复，逐段产出新增文本"""
+        await self.ensure_initialized()
         
+        # 应用聊天模板
+        text = self._build_chat_text(prompt, system_message)
+        
+        # 引擎每次产出的是累计文本，这里只返回新增部分
+        sent_length = 0
+        async for output in self.engine.generate(text, self.sampling_params, uuid.uuid4().hex):
+            generated_text = output.outputs[0].text
+            if len(generated_text) > sent_length:
+                yield generated_text[sent_length:]
+                sent_length = len(generated_text)
+    
+    async def generate_response(self, prompt: str, system_message: str = None) -> str:
+        """生成法律咨询回复"""
         try:
-            # 构建消息
-            if system_message is None:
-                system_message = "你是LawLLM，一个由复旦大学DISC实验室创造的法律助手。"
-            
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ]
-            
-            # 应用聊天模板
-            text = self.tokenizer.apply_chat_template(
-                messages,
-                tokenize=False,
-                add_generation_prompt=True
-            )
-            
-            # 生成回复
-            outputs = self.llm.generate([text], self.sampling_params)
-            
-            for output in outputs:
-                generated_text = output.outputs[0].text
-                return generated_text.strip()
+            chunks = [chunk async for chunk in self.stream_response(prompt, system_message)]
+            return "".join(chunks).strip()
                 
         except Exception as e:
             logger.error(f"❌ 生成回复失败: {e}")
             return f"抱歉，生成回复时出现错误: {str(e)}"
     
-    def legal_consultation(self, question: str, context: str = None) -> Dict[str, Any]:
+    def _build_consultation_prompt(self, question: str, context: str = None) -> str:
+        """构建法律咨询提示词"""
+        if context:
+            return f"问题: {question}\n\n背景信息: {context}\n\n请提供详细的法律分析和建议。"
+        return question
+    
+    async def stream_consultation(self, question: str, context: str = None) -> AsyncIterator[str]:
+        """流式法律咨询"""
+        async for chunk in self.stream_response(self._build_consultation_prompt(question, context)):
+            yield chunk
+    
+    async def legal_consultation(self, question: str, context: str = None) -> Dict[str, Any]:
         """法律咨询"""
         try:
             # 构建提示词
-            if context:
-                prompt = f"问题: {question}\n\n背景信息: {context}\n\n请提供详细的法律分析和建议。"
-            else:
-                prompt = question
+            prompt = self._build_consultation_prompt(question, context)
             
             # 生成回复
-            response = self.generate_response(prompt)
+            response = await self.generate_response(prompt)
             
             # 分析回复质量
             confidence = self._analyze_response_quality(response)
@@ -121,12 +192,12 @@ class LawLLMService:
                 "context": context
             }
     
-    def legal_analysis(self, case_text: str) -> Dict[str, Any]:
+    async def legal_analysis(self, case_text: str) -> Dict[str, Any]:
         """法律案例分析"""
         try:
             prompt = f"请分析以下法律案例，包括案件性质、适用法律、可能的法律后果等:\n\n{case_text}"
             
-            response = self.generate_response(prompt)
+            response = await self.generate_response(prompt)
             confidence = self._analyze_response_quality(response)
             
             return {
@@ -147,12 +218,12 @@ class LawLLMService:
                 "timestamp": datetime.now().isoformat()
             }
     
-    def legal_document_review(self, document_text: str) -> Dict[str, Any]:
+    async def legal_document_review(self, document_text: str) -> Dict[str, Any]:
         """法律文档审查"""
         try:
             prompt = f"请审查以下法律文档，指出潜在的法律风险、合规问题和改进建议:\n\n{document_text}"
             
-            response = self.generate_response(prompt)
+            response = await self.generate_response(prompt)
             confidence = self._analyze_response_quality(response)
             
             return {
@@ -173,12 +244,12 @@ class LawLLMService:
                 "timestamp": datetime.now().isoformat()
             }
     
-    def legal_research(self, research_topic: str) -> Dict[str, Any]:
+    async def legal_research(self, research_topic: str) -> Dict[str, Any]:
         """法律研究"""
         try:
             prompt = f"请就以下法律研究主题提供详细的研究报告，包括相关法律条文、案例分析、学术观点等:\n\n{research_topic}"
             
-            response = self.generate_response(prompt)
+            response = await self.generate_response(prompt)
             confidence = self._analyze_response_quality(response)
             
             return {
@@ -210,8 +281,7 @@ class LawLLMService:
                 quality_score += 0.2
             
             # 法律关键词检查
-            legal_keywords = ["法律", "法规", "条文", "规定", "条款", "案例", "判决", "法院", "律师", "诉讼"]
-            keyword_count = sum(1 for keyword in legal_keywords if keyword in response)
+            keyword_count = len(set(_QUALITY_RE.findall(response)))
             quality_score += min(keyword_count * 0.1, 0.4)
             
             # 结构检查
@@ -228,23 +298,24 @@ class LawLLMService:
             logger.error(f"❌ 质量分析失败: {e}")
             return 0.5
     
-    def batch_consultation(self, questions: List[str]) -> List[Dict[str, Any]]:
+    async def batch_consultation(self, questions: List[str]) -> List[Dict[str, Any]]:
         """批量法律咨询"""
-        results = []
+        # 并发提交全部问题，由vLLM异步引擎连续批处理调度；gather保持输入顺序
+        results = await asyncio.gather(
+            *(self.legal_consultation(question) for question in questions),
+            return_exceptions=True
+        )
         
-        for question in questions:
-            try:
-                result = self.legal_consultation(question)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"❌ 批量咨询失败: {e}")
-                results.append({
-                    "question": question,
-                    "answer": f"处理失败: {str(e)}",
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ 批量咨询失败: {result}")
+                results[i] = {
+                    "question": questions[i],
+                    "answer": f"处理失败: {str(result)}",
                     "confidence": 0.0,
                     "model": self.model_name,
                     "timestamp": datetime.now().isoformat()
-                })
+                }
         
         return results
     
@@ -252,14 +323,14 @@ class LawLLMService:
         """获取模型信息"""
         return {
             "model_name": self.model_name,
+            "quantization": self.quantization,
             "is_initialized": self.is_initialized,
             "sampling_params": {
                 "temperature": self.sampling_params.temperature if self.sampling_params else None,
                 "top_p": self.sampling_params.top_p if self.sampling_params else None,
                 "top_k": self.sampling_params.top_k if self.sampling_params else None,
                 "max_tokens": self.sampling_params.max_tokens if self.sampling_params else None
-            },
-            "timestamp": datetime.now().isoformat()
+            }
         }
 
 # 全局服务实例
@@ -1,35 +1,158 @@
 #!/usr/bin/env python3
 """
 LawLLM-7B 法律服务 - Windows兼容版本
-基于 transformers 库的法律智能服务，不依赖 vLLM
+基于 transformers 库的法律智能服务；vLLM 为可选依赖，有GPU且已安装时优先使用 vLLM 引擎
 """
 import os
+import re
 import sys
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import importlib.util
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 import torch
+import transformers
+from packaging import version
 from transformers import (
     AutoTokenizer, 
     AutoModelForCausalLM,
+    BitsAndBytesConfig,
     pipeline,
-    TextGenerationPipeline
+    TextGenerationPipeline,
+    TextIteratorStreamer
 )
 import json
 from datetime import datetime
 
+# vLLM 为可选依赖，Windows 下通常无法安装
+try:
+    from vllm import LLM, SamplingParams
+except ImportError:
+    LLM = None
+    SamplingParams = None
+
+# from_pretrained 的 attn_implementation 参数自 transformers 4.36 起才支持
+TRANSFORMERS_SUPPORTS_ATTN_IMPLEMENTATION = version.parse(transformers.__version__) >= version.parse("4.36.0")
+
+# FlashAttention-2 为可选依赖（pip install flash-attn，需要Ampere及以上GPU）
+FLASH_ATTN_AVAILABLE = importlib.util.find_spec("flash_attn") is not None
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 默认系统提示词
+DEFAULT_SYSTEM_MESSAGE = "你是LawLLM，一个由复旦大学DISC实验室创造的法律助手。"
+
+# 各类法律任务：任务类型 -> (输入字段, 输出字段, 提示词模板)
+LEGAL_TASKS = {
+    "consultation": ("question", "answer", "{}"),
+    "analysis": ("case_text", "analysis", "请分析以下法律案例，包括案件性质、适用法律、可能的法律后果等:\n\n{}"),
+    "review": ("document_text", "review", "请审查以下法律文档，指出潜在的法律风险、合规问题和改进建议:\n\n{}"),
+    "research": ("research_topic", "research_report", "请就以下法律研究主题提供详细的研究报告，包括相关法律条文、案例分析、学术观点等:\n\n{}"),
+}
+
+# 回复质量评估使用的法律关键词
+LEGAL_KEYWORDS = ["法律", "法规", "条文", "规定", "条款", "案例", "判决", "法院", "律师", "诉讼"]
+
+# 一次扫描匹配全部关键词；零宽前瞻保证重叠出现的关键词也能被计入
+_QUALITY_RE = re.compile("(?=(" + "|".join(map(re.escape, LEGAL_KEYWORDS)) + "))")
+
+# 模拟回复模板（模型不可用时使用）
+MOCK_RESPONSES = {
+    "生产销售假冒伪劣商品罪如何判刑": """
+根据《中华人民共和国刑法》第一百四十条规定，生产、销售伪劣产品罪是指生产者、销售者在产品中掺杂、掺假，以假充真，以次充好或者以不合格产品冒充合格产品，销售金额五万元以上的行为。
+
+量刑标准：
+1. 销售金额五万元以上不满二十万元的，处二年以下有期徒刑或者拘役，并处或者单处销售金额百分之五十以上二倍以下罚金；
+2. 销售金额二十万元以上不满五十万元的，处二年以上七年以下有期徒刑，并处销售金额百分之五十以上二倍以下罚金；
+3. 销售金额五十万元以上不满二百万元的，处七年以上有期徒刑，并处销售金额百分之五十以上二倍以下罚金；
+4. 销售金额二百万元以上的，处十五年有期徒刑或者无期徒刑，并处销售金额百分之五十以上二倍以下罚金或者没收财产。
+            """,
+    "劳动合同解除需要什么条件": """
+根据《中华人民共和国劳动合同法》规定，劳动合同解除需要满足以下条件：
+
+一、用人单位解除劳动合同的条件：
+1. 劳动者在试用期间被证明不符合录用条件的；
+2. 劳动者严重违反用人单位的规章制度的；
+3. 劳动者严重失职，营私舞弊，给用人单位造成重大损害的；
+4. 劳动者同时与其他用人单位建立劳动关系，对完成本单位的工作任务造成严重影响，或者经用人单位提出，拒不改正的；
+5. 劳动者以欺诈、胁迫的手段或者乘人之危，使用人单位在违背真实意思的情况下订立或者变更劳动合同的；
+6. 劳动者被依法追究刑事责任的。
+
+二、劳动者解除劳动合同的条件：
+1. 提前三十日以书面形式通知用人单位；
+2. 在试用期内提前三日通知用人单位；
+3. 用人单位未按照劳动合同约定提供劳动保护或者劳动条件的；
+4. 用人单位未及时足额支付劳动报酬的；
+5. 用人单位未依法为劳动者缴纳社会保险费的；
+6. 用人单位的规章制度违反法律、法规的规定，损害劳动者权益的。
+            """,
+    "知识产权侵权如何维权": """
+知识产权侵权维权途径：
+
+一、行政途径：
+1. 向知识产权局申请行政处理；
+2. 向工商行政管理部门举报；
+3. 向海关申请知识产权保护。
+
+二、司法途径：
+1. 向人民法院提起民事诉讼；
+2. 向公安机关报案（构成犯罪时）；
+3. 申请诉前禁令和财产保全。
+
+三、维权步骤：
+1. 收集侵权证据；
+2. 确定侵权事实和损失；
+3. 选择维权途径；
+4. 准备相关材料；
+5. 提起诉讼或申请行政处理。
+
+四、赔偿标准：
+1. 实际损失；
+2. 侵权人获得的利益；
+3. 许可使用费的合理倍数；
+4. 法定赔偿（最高500万元）。
+            """
+}
+
+# 关键词到(模板顺序, 回复)的索引
+_MOCK_INDEX = {}
+for _order, (_key, _response) in enumerate(MOCK_RESPONSES.items()):
+    for _word in _key.split():
+        _MOCK_INDEX.setdefault(_word, (_order, _response.strip()))
+
+# 零宽前瞻匹配全部关键词，重叠出现的关键词也能被找到
+_MOCK_KEYWORD_RE = re.compile("(?=(" + "|".join(map(re.escape, _MOCK_INDEX)) + "))")
+
 class LawLLMServiceWindows:
     """LawLLM-7B 法律服务类 - Windows兼容版本"""
     
-    def __init__(self, model_name: str = "ShengbinYue/LawLLM-7B"):
+    def __init__(self, model_name: str = "ShengbinYue/LawLLM-7B", awq_model_name: Optional[str] = None,
+                 load_in_8bit: Optional[bool] = None):
         self.model_name = model_name
+        # bitsandbytes INT8量化需显式开启（Windows下常无可用的CUDA构建），默认读取 LAWLLM_LOAD_IN_8BIT
+        if load_in_8bit is None:
+            load_in_8bit = os.environ.get("LAWLLM_LOAD_IN_8BIT") == "1"
+        self.load_in_8bit = load_in_8bit
+        # 运行设备在进程生命周期内不变，只探测一次
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # 预量化的AWQ权重（vLLM引擎使用），未提供时加载FP16权重
+        self.awq_model_name = awq_model_name
+        # 实际使用的权重量化方式: awq / int8 / None
+        self.quantization = None
         self.tokenizer = None
         self.model = None
         self.pipeline = None
+        # vLLM 引擎（有GPU且已安装vLLM时使用）
+        self.llm = None
+        self.sampling_params = None
+        # 默认系统提示词部分的token，transformers路径下只分词一次
+        self._system_prefix_ids = None
         self.is_initialized = False
+        # 同步接口在请求线程中、批量接口在 asyncio.to_thread 工作线程中初始化，加锁保证模型只加载一次
+        self._init_lock = threading.Lock()
         
         # 生成参数
         self.generation_config = {
@@ -42,15 +165,34 @@ class LawLLMServiceWindows:
             "eos_token_id": None,
         }
         
+        # vLLM 引擎参数：KV缓存量化为FP8，减半解码阶段的KV显存带宽
+        self.kv_cache_dtype = "fp8_e5m2"
+        
     def initialize(self):
-        """初始化模型"""
+        """初始化模型（线程安全，并发的首次调用只加载一次）"""
+        if self.is_initialized:
+            return
+        with self._init_lock:
+            if not self.is_initialized:
+                self._initialize()
+    
+    def _initialize(self):
+        """加载模型，调用方需持有初始化锁"""
         try:
             logger.info(f"🚀 初始化 LawLLM-7B 模型 (Windows兼容版本): {self.model_name}")
             
-            # 检查是否有GPU
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+            device = self.device
             logger.info(f"使用设备: {device}")
             
+            # 有GPU且已安装vLLM时，优先使用vLLM引擎（PagedAttention + 连续批处理）
+            if device == "cuda" and LLM is not None:
+                try:
+                    self._initialize_vllm()
+                    return
+                except Exception as e:
+                    logger.warning(f"⚠️ vLLM引擎初始化失败，改用transformers: {e}")
+                    self.llm = None
+            
             # 加载分词器
             self.tokenizer = AutoTokenizer.from_pretrained(
                 self.model_name,
@@ -61,23 +203,75 @@ class LawLLMServiceWindows:
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
             
-            # 加载模型
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name,
-                torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-                device_map="auto" if device == "cuda" else None,
-                trust_remote_code=True
-            )
+            # 解码器批量生成需要左侧填充
+            self.tokenizer.padding_side = "left"
+            
+            # 加载模型，开启INT8时GPU上使用bitsandbytes权重量化，权重显存与带宽减半
+            quantization_config = None
+            if device == "cuda" and self.load_in_8bit:
+                quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+            
+            attn_implementation, torch_dtype = self._select_attention(device)
+            logger.info(f"注意力实现: {attn_implementation}")
+            
+            # 旧版transformers不认识attn_implementation参数，eager为默认实现，也无需传入
+            model_kwargs = {}
+            if TRANSFORMERS_SUPPORTS_ATTN_IMPLEMENTATION and attn_implementation != "eager":
+                model_kwargs["attn_implementation"] = attn_implementation
+            
+            try:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name,
+                    torch_dtype=torch_dtype,
+                    device_map="auto" if device == "cuda" else None,
+                    quantization_config=quantization_config,
+                    trust_remote_code=True,
+                    **model_kwargs
+                )
+                self.quantization = "int8" if quantization_config is not None else None
+            except Exception as e:
+                if quantization_config is None:
+                    raise
+                # bitsandbytes不可用时以FP16重新加载，而不是直接退回模拟服务
+                logger.warning(f"⚠️ INT8量化加载失败，改用FP16: {e}")
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name,
+                    torch_dtype=torch_dtype,
+                    device_map="auto",
+                    trust_remote_code=True,
+                    **model_kwargs
+                )
+                self.quantization = None
+            
+            # GPU且PyTorch 2.x时编译前向计算（torch.compile不支持Windows）。只替换forward而不包装模型，
+            # 这样pipeline与generate拿到的仍是原始的transformers模型
+            if device == "cuda" and sys.platform != "win32" and hasattr(torch, "compile"):
+                self.model.forward = torch.compile(self.model.forward, dynamic=True)
             
             # 创建文本生成管道
+            # GPU上模型已由device_map分配设备（INT8模型也不支持再移动），不再指定device
             self.pipeline = pipeline(
                 "text-generation",
                 model=self.model,
                 tokenizer=self.tokenizer,
-                device=0 if device == "cuda" else -1,
-                torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+                device=None if device == "cuda" else -1,
+                torch_dtype=torch_dtype,
             )
             
+            # 系统提示词固定，预先分词
+            self._system_prefix_ids = self._encode_system_prefix(DEFAULT_SYSTEM_MESSAGE)
+            
+            # 预热一次生成，把编译开销放在首个真实请求之前
+            if device == "cuda":
+                warmup_ids = self._system_prefix_ids.to(self.model.device)
+                with torch.inference_mode():
+                    self.model.generate(
+                        warmup_ids,
+                        attention_mask=torch.ones_like(warmup_ids),
+                        max_new_tokens=2,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                    )
+            
             self.is_initialized = True
             logger.info("✅ LawLLM-7B 模型初始化完成 (Windows兼容版本)")
             
@@ -86,6 +280,53 @@ class LawLLMServiceWindows:
             # 如果模型加载失败，使用模拟服务
             self._initialize_mock_service()
     
+    def _select_attention(self, device: str):
+        """选择注意力实现与计算精度
+        
+        Ampere及以上GPU且安装了flash-attn时使用FlashAttention-2与bf16，
+        否则使用PyTorch的SDPA（PyTorch 2.x），都不可用时退回eager实现
+        """
+        if device == "cuda":
+            if FLASH_ATTN_AVAILABLE and torch.cuda.get_device_capability()[0] >= 8:
+                return "flash_attention_2", torch.bfloat16
+            torch_dtype = torch.float16
+        else:
+            torch_dtype = torch.float32
+        
+        if hasattr(torch.nn.functional, "scaled_dot_product_attention"):
+            return "sdpa", torch_dtype
+        return "eager", torch_dtype
+    
+    def _initialize_vllm(self):
+        """初始化vLLM引擎"""
+        self.sampling_params = SamplingParams(
+            temperature=self.generation_config["temperature"],
+            top_p=self.generation_config["top_p"],
+            top_k=self.generation_config["top_k"],
+            max_tokens=self.generation_config["max_new_tokens"]
+        )
+        
+        # 有预量化的AWQ权重时优先加载
+        if self.awq_model_name:
+            model, quantization = self.awq_model_name, "awq"
+        else:
+            model, quantization = self.model_name, None
+        
+        self.llm = LLM(
+            model=model,
+            quantization=quantization,
+            dtype="float16",
+            gpu_memory_utilization=0.9,
+            max_model_len=4096,
+            enable_prefix_caching=True,
+            kv_cache_dtype=self.kv_cache_dtype,
+            trust_remote_code=True
+        )
+        self.quantization = quantization
+        
+        self.is_initialized = True
+        logger.info("✅ LawLLM-7B 模型初始化完成 (vLLM引擎)")
+    
     def _initialize_mock_service(self):
         """初始化模拟服务（当模型加载失败时）"""
         logger.warning("⚠️ 使用模拟服务模式")
@@ -97,32 +338,29 @@ class LawLLMServiceWindows:
             self.initialize()
         
         try:
-            # 构建消息
-            if system_message is None:
-                system_message = "你是LawLLM，一个由复旦大学DISC实验室创造的法律助手。"
-            
             # 构建完整的提示词
-            full_prompt = f"{system_message}\n\n用户问题: {prompt}\n\n回答:"
+            full_prompt = self._build_prompt(prompt, system_message)
             
-            if self.pipeline is None:
+            if self.llm is not None:
+                outputs = self.llm.generate([full_prompt], self.sampling_params)
+                response = outputs[0].outputs[0].text.strip()
+                return response if response else self._generate_mock_response(prompt)
+            
+            if self.model is None:
                 # 使用模拟回复
                 return self._generate_mock_response(prompt)
             
+            input_ids = self._build_input_ids(prompt, system_message)
+            
             # 生成回复
-            result = self.pipeline(
-                full_prompt,
-                max_new_tokens=self.generation_config["max_new_tokens"],
-                temperature=self.generation_config["temperature"],
-                top_p=self.generation_config["top_p"],
-                top_k=self.generation_config["top_k"],
-                do_sample=self.generation_config["do_sample"],
-                pad_token_id=self.tokenizer.pad_token_id,
-                eos_token_id=self.tokenizer.eos_token_id,
-            )
+            with torch.inference_mode():
+                output_ids = self._generate_ids(input_ids)
             
-            # 提取生成的文本
-            generated_text = result[0]["generated_text"]
-            response = generated_text[len(full_prompt):].strip()
+            # 只解码新生成的部分
+            response = self.tokenizer.decode(
+                output_ids[0, input_ids.shape[-1]:],
+                skip_special_tokens=True
+            ).strip()
             
             return response if response else self._generate_mock_response(prompt)
                 
@@ -130,69 +368,54 @@ class LawLLMServiceWindows:
             logger.error(f"❌ 生成回复失败: {e}")
             return self._generate_mock_response(prompt)
     
+    def _build_input_ids(self, prompt: str, system_message: str = None) -> torch.Tensor:
+        """构建模型输入，系统提示词部分复用预先分词的结果，只对用户输入分词"""
+        if system_message is None or system_message == DEFAULT_SYSTEM_MESSAGE:
+            prefix_ids = self._system_prefix_ids
+        else:
+            prefix_ids = self._encode_system_prefix(system_message)
+        user_ids = self.tokenizer(
+            f"{prompt}\n\n回答:",
+            add_special_tokens=False,
+            return_tensors="pt"
+        ).input_ids
+        return torch.cat([prefix_ids, user_ids], dim=-1).to(self.model.device)
+    
+    def _generate_ids(self, input_ids: torch.Tensor, **kwargs) -> torch.Tensor:
+        """按生成参数调用 model.generate"""
+        return self.model.generate(
+            input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            max_new_tokens=self.generation_config["max_new_tokens"],
+            temperature=self.generation_config["temperature"],
+            top_p=self.generation_config["top_p"],
+            top_k=self.generation_config["top_k"],
+            do_sample=self.generation_config["do_sample"],
+            pad_token_id=self.tokenizer.pad_token_id,
+            eos_token_id=self.tokenizer.eos_token_id,
+            **kwargs
+        )
+    
+    def _build_prompt(self, prompt: str, system_message: str = None) -> str:
+        """构建完整的提示词"""
+        if system_message is None:
+            system_message = DEFAULT_SYSTEM_MESSAGE
+        
+        return f"{system_message}\n\n用户问题: {prompt}\n\n回答:"
+    
+    def _encode_system_prefix(self, system_message: str) -> torch.Tensor:
+        """对提示词中系统提示词部分分词"""
+        return self.tokenizer(
+            f"{system_message}\n\n用户问题: ",
+            return_tensors="pt"
+        ).input_ids
+    
     def _generate_mock_response(self, prompt: str) -> str:
         """生成模拟回复"""
-        mock_responses = {
-            "生产销售假冒伪劣商品罪如何判刑": """
-根据《中华人民共和国刑法》第一百四十条规定，生产、销售伪劣产品罪是指生产者、销售者在产品中掺杂、掺假，以假充真，以次充好或者以不合格产品冒充合格产品，销售金额五万元以上的行为。
-
-量刑标准：
-1. 销售金额五万元以上不满二十万元的，处二年以下有期徒刑或者拘役，并处或者单处销售金额百分之五十以上二倍以下罚金；
-2. 销售金额二十万元以上不满五十万元的，处二年以上七年以下有期徒刑，并处销售金额百分之五十以上二倍以下罚金；
-3. 销售金额五十万元以上不满二百万元的，处七年以上有期徒刑，并处销售金额百分之五十以上二倍以下罚金；
-4. 销售金额二百万元以上的，处十五年有期徒刑或者无期徒刑，并处销售金额百分之五十以上二倍以下罚金或者没收财产。
-            """,
-            "劳动合同解除需要什么条件": """
-根据《中华人民共和国劳动合同法》规定，劳动合同解除需要满足以下条件：
-
-一、用人单位解除劳动合同的条件：
-1. 劳动者在试用期间被证明不符合录用条件的；
-2. 劳动者严重违反用人单位的规章制度的；
-3. 劳动者严重失职，营私舞弊，给用人单位造成重大损害的；
-4. 劳动者同时与其他用人单位建立劳动关系，对完成本单位的工作任务造成严重影响，或者经用人单位提出，拒不改正的；
-5. 劳动者以欺诈、胁迫的手段或者乘人之危，使用人单位在违背真实意思的情况下订立或者变更劳动合同的；
-6. 劳动者被依法追究刑事责任的。
-
-二、劳动者解除劳动合同的条件：
-1. 提前三十日以书面形式通知用人单位；
-2. 在试用期内提前三日通知用人单位；
-3. 用人单位未按照劳动合同约定提供劳动保护或者劳动条件的；
-4. 用人单位未及时足额支付劳动报酬的；
-5. 用人单位未依法为劳动者缴纳社会保险费的；
-6. 用人单位的规章制度违反法律、法规的规定，损害劳动者权益的。
-            """,
-            "知识产权侵权如何维权": """
-知识产权侵权维权途径：
-
-一、行政途径：
-1. 向知识产权局申请行政处理；
-2. 向工商行政管理部门举报；
-3. 向海关申请知识产权保护。
-
-二、司法途径：
-1. 向人民法院提起民事诉讼；
-2. 向公安机关报案（构成犯罪时）；
-3. 申请诉前禁令和财产保全。
-
-三、维权步骤：
-1. 收集侵权证据；
-2. 确定侵权事实和损失；
-3. 选择维权途径；
-4. 准备相关材料；
-5. 提起诉讼或申请行政处理。
-
-四、赔偿标准：
-1. 实际损失；
-2. 侵权人获得的利益；
-3. 许可使用费的合理倍数；
-4. 法定赔偿（最高500万元）。
-            """
-        }
-        
-        # 简单的关键词匹配
-        for key, response in mock_responses.items():
-            if any(word in prompt for word in key.split()):
-                return response.strip()
+        # 简单的关键词匹配：一次正则扫描找出命中的关键词，按模板顺序取第一个
+        matched = _MOCK_KEYWORD_RE.findall(prompt)
+        if matched:
+            return min((_MOCK_INDEX[word] for word in matched), key=lambda entry: entry[0])[1]
         
         # 默认回复
         return f"""
@@ -210,14 +433,52 @@ class LawLLMServiceWindows:
 （注：当前使用模拟服务模式，建议安装完整模型以获得更准确的回答）
         """.strip()
     
+    def _build_consultation_prompt(self, question: str, context: str = None) -> str:
+        """构建法律咨询提示词"""
+        if context:
+            return f"问题: {question}\n\n背景信息: {context}\n\n请提供详细的法律分析和建议。"
+        return question
+    
+    async def stream_consultation(self, question: str, context: str = None) -> AsyncIterator[str]:
+        """流式法律咨询
+        
+        transformers路径下逐段产出新生成的文本；vLLM同步引擎与模拟模式不支持增量输出，一次产出完整回复
+        """
+        if not self.is_initialized:
+            await asyncio.to_thread(self.initialize)
+        
+        prompt = self._build_consultation_prompt(question, context)
+        if self.llm is not None or self.model is None:
+            yield await asyncio.to_thread(self.generate_response, prompt)
+            return
+        
+        input_ids = self._build_input_ids(prompt)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        
+        def generate():
+            try:
+                with torch.inference_mode():
+                    self._generate_ids(input_ids, streamer=streamer)
+            finally:
+                # 生成出错时也要结束迭代，避免消费端一直等待
+                streamer.end()
+        
+        generation = asyncio.ensure_future(asyncio.to_thread(generate))
+        try:
+            # 读取streamer会阻塞，在工作线程中取下一段文本
+            while True:
+                chunk = await asyncio.to_thread(next, streamer, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    yield chunk
+        finally:
+            await generation
+    
     def legal_consultation(self, question: str, context: str = None) -> Dict[str, Any]:
         """法律咨询"""
         try:
-            # 构建提示词
-            if context:
-                prompt = f"问题: {question}\n\n背景信息: {context}\n\n请提供详细的法律分析和建议。"
-            else:
-                prompt = question
+            prompt = self._build_consultation_prompt(question, context)
             
             # 生成回复
             response = self.generate_response(prompt)
@@ -248,7 +509,7 @@ class LawLLMServiceWindows:
     def legal_analysis(self, case_text: str) -> Dict[str, Any]:
         """法律案例分析"""
         try:
-            prompt = f"请分析以下法律案例，包括案件性质、适用法律、可能的法律后果等:\n\n{case_text}"
+            prompt = LEGAL_TASKS["analysis"][2].format(case_text)
             
             response = self.generate_response(prompt)
             confidence = self._analyze_response_quality(response)
@@ -274,7 +535,7 @@ class LawLLMServiceWindows:
     def legal_document_review(self, document_text: str) -> Dict[str, Any]:
         """法律文档审查"""
         try:
-            prompt = f"请审查以下法律文档，指出潜在的法律风险、合规问题和改进建议:\n\n{document_text}"
+            prompt = LEGAL_TASKS["review"][2].format(document_text)
             
             response = self.generate_response(prompt)
             confidence = self._analyze_response_quality(response)
@@ -300,7 +561,7 @@ class LawLLMServiceWindows:
     def legal_research(self, research_topic: str) -> Dict[str, Any]:
         """法律研究"""
         try:
-            prompt = f"请就以下法律研究主题提供详细的研究报告，包括相关法律条文、案例分析、学术观点等:\n\n{research_topic}"
+            prompt = LEGAL_TASKS["research"][2].format(research_topic)
             
             response = self.generate_response(prompt)
             confidence = self._analyze_response_quality(response)
@@ -334,8 +595,7 @@ class LawLLMServiceWindows:
                 quality_score += 0.2
             
             # 法律关键词检查
-            legal_keywords = ["法律", "法规", "条文", "规定", "条款", "案例", "判决", "法院", "律师", "诉讼"]
-            keyword_count = sum(1 for keyword in legal_keywords if keyword in response)
+            keyword_count = len(set(_QUALITY_RE.findall(response)))
             quality_score += min(keyword_count * 0.1, 0.4)
             
             # 结构检查
@@ -352,23 +612,110 @@ class LawLLMServiceWindows:
             logger.error(f"❌ 质量分析失败: {e}")
             return 0.5
     
-    def batch_consultation(self, questions: List[str]) -> List[Dict[str, Any]]:
+    async def batch_consultation(self, questions: List[str]) -> List[Dict[str, Any]]:
         """批量法律咨询"""
-        results = []
+        # 推理为阻塞调用，放到线程中执行，避免阻塞事件循环
+        return await asyncio.to_thread(self._batch_consultation_sync, questions)
+    
+    def _batch_consultation_sync(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """批量法律咨询（同步执行）"""
+        if not self.is_initialized:
+            self.initialize()
         
-        for question in questions:
-            try:
-                result = self.legal_consultation(question)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"❌ 批量咨询失败: {e}")
-                results.append({
+        try:
+            responses = self._batch_generate(questions)
+        except Exception as e:
+            logger.error(f"❌ 批量咨询失败: {e}")
+            return [
+                {
                     "question": question,
                     "answer": f"处理失败: {str(e)}",
                     "confidence": 0.0,
                     "model": f"{self.model_name} (Windows兼容版本)",
                     "timestamp": datetime.now().isoformat()
-                })
+                }
+                for question in questions
+            ]
+        
+        results = []
+        for question, response in zip(questions, responses):
+            response = response or self._generate_mock_response(question)
+            results.append({
+                "question": question,
+                "answer": response,
+                "confidence": self._analyze_response_quality(response),
+                "model": f"{self.model_name} (Windows兼容版本)",
+                "timestamp": datetime.now().isoformat(),
+                "context": None
+            })
+        
+        return results
+    
+    def _batch_generate(self, prompts: List[str]) -> List[str]:
+        """批量生成回复，结果与输入顺序一致"""
+        full_prompts = [self._build_prompt(prompt) for prompt in prompts]
+        
+        if self.llm is not None:
+            # vLLM一次性提交全部提示词，由调度器连续批处理
+            outputs = self.llm.generate(full_prompts, self.sampling_params)
+            return [output.outputs[0].text.strip() for output in outputs]
+        
+        if self.pipeline is not None:
+            # 传入列表时管道按batch_size分批前向计算
+            outputs = self.pipeline(
+                full_prompts,
+                batch_size=8,
+                max_new_tokens=self.generation_config["max_new_tokens"],
+                temperature=self.generation_config["temperature"],
+                top_p=self.generation_config["top_p"],
+                top_k=self.generation_config["top_k"],
+                do_sample=self.generation_config["do_sample"],
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id,
+                return_full_text=False,
+            )
+            return [output[0]["generated_text"].strip() for output in outputs]
+        
+        return [self._generate_mock_response(prompt) for prompt in prompts]
+    
+    async def batch_tasks(self, tasks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """批量执行不同类型的法律任务（咨询/分析/审查/研究），共用一次批量推理"""
+        return await asyncio.to_thread(self._batch_tasks_sync, tasks)
+    
+    def _batch_tasks_sync(self, tasks: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """批量执行法律任务（同步执行）"""
+        if not self.is_initialized:
+            self.initialize()
+        
+        prompts = [LEGAL_TASKS[kind][2].format(text) for kind, text in tasks]
+        try:
+            responses = self._batch_generate(prompts)
+        except Exception as e:
+            logger.error(f"❌ 批量任务失败: {e}")
+            return [
+                {
+                    "task": kind,
+                    LEGAL_TASKS[kind][0]: text,
+                    LEGAL_TASKS[kind][1]: f"处理失败: {str(e)}",
+                    "confidence": 0.0,
+                    "model": f"{self.model_name} (Windows兼容版本)",
+                    "timestamp": datetime.now().isoformat()
+                }
+                for kind, text in tasks
+            ]
+        
+        results = []
+        for (kind, text), prompt, response in zip(tasks, prompts, responses):
+            input_field, output_field, _ = LEGAL_TASKS[kind]
+            response = response or self._generate_mock_response(prompt)
+            results.append({
+                "task": kind,
+                input_field: text,
+                output_field: response,
+                "confidence": self._analyze_response_quality(response),
+                "model": f"{self.model_name} (Windows兼容版本)",
+                "timestamp": datetime.now().isoformat()
+            })
         
         return results
     
@@ -378,9 +725,10 @@ class LawLLMServiceWindows:
             "model_name": self.model_name,
             "is_initialized": self.is_initialized,
             "generation_config": self.generation_config,
-            "device": "cuda" if torch.cuda.is_available() else "cpu",
-            "version": "Windows兼容版本",
-            "timestamp": datetime.now().isoformat()
+            "quantization": self.quantization,
+            "engine": "vllm" if self.llm is not None else ("transformers" if self.pipeline is not None else "mock"),
+            "device": self.device,
+            "version": "Windows兼容版本"
         }
 
 # 全局服务实例
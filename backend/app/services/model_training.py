@@ -2,52 +2,23 @@
 BERT法律模型训练服务
 """
 import os
+import copy
 import json
 import torch
-import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 from transformers import (
     BertTokenizer, 
     BertForSequenceClassification,
     TrainingArguments, 
     Trainer,
+    DataCollatorWithPadding,
     AutoTokenizer,
     AutoModelForSequenceClassification
 )
-from torch.utils.data import Dataset
-from sklearn.model_selection import train_test_split
+from datasets import load_dataset
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
 import numpy as np
 
-class LegalDataset(Dataset):
-    """法律文本数据集"""
-    def __init__(self, texts, labels, tokenizer, max_length=512):
-        self.texts = texts
-        self.labels = labels
-        self.tokenizer = tokenizer
-        self.max_length = max_length
-    
-    def __len__(self):
-        return len(self.texts)
-    
-    def __getitem__(self, idx):
-        text = str(self.texts[idx])
-        label = self.labels[idx]
-        
-        encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding='max_length',
-            max_length=self.max_length,
-            return_tensors='pt'
-        )
-        
-        return {
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'labels': torch.tensor(label, dtype=torch.long)
-        }
-
 class LegalBERTTrainer:
     """法律BERT模型训练器"""
     
@@ -56,6 +27,10 @@ class LegalBERTTrainer:
         self.tokenizer = None
         self.model = None
         self.trainer = None
+        # 推理用的编译模型，首次预测时创建
+        self.inference_model = None
+        # ONNX Runtime推理会话，调用export_onnx后预测改走ONNX Runtime
+        self.onnx_session = None
         
     def setup_model(self):
         """设置模型和分词器"""
@@ -70,6 +45,7 @@ class LegalBERTTrainer:
             model_name,
             num_labels=num_labels
         )
+        self.inference_model = None
         
         print(f"✅ 模型设置完成: {model_name}")
         print(f"📊 分类标签数量: {num_labels}")
@@ -78,32 +54,33 @@ class LegalBERTTrainer:
         """准备训练数据"""
         print("📚 准备训练数据...")
         
-        # 读取数据
+        # 读取数据，由Arrow内存映射存储，不在Python堆中逐行创建对象
         if data_path.endswith('.csv'):
-            df = pd.read_csv(data_path)
+            data_format = 'csv'
         elif data_path.endswith('.json'):
-            with open(data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            df = pd.DataFrame(data)
+            data_format = 'json'
         else:
             raise ValueError("支持的数据格式: CSV, JSON")
-        
-        # 数据预处理
-        texts = df['text'].tolist()
-        labels = df['label'].tolist()
+        dataset = load_dataset(data_format, data_files=data_path, split='train')
         
         # 分割数据集
-        train_texts, val_texts, train_labels, val_labels = train_test_split(
-            texts, labels, test_size=0.2, random_state=42
-        )
+        dataset = dataset.train_test_split(test_size=0.2, seed=42)
         
-        # 创建数据集
-        train_dataset = LegalDataset(
-            train_texts, train_labels, self.tokenizer, self.config.get('max_length', 512)
-        )
-        val_dataset = LegalDataset(
-            val_texts, val_labels, self.tokenizer, self.config.get('max_length', 512)
+        # 多进程批量分词，不做填充；按批次动态填充由DataCollatorWithPadding完成
+        # 闭包只引用分词器与长度，避免把整个训练器（含已加载的模型）序列化到每个工作进程
+        tokenizer = self.tokenizer
+        max_length = self.config.get('max_length', 512)
+        dataset = dataset.map(
+            lambda examples: tokenizer(
+                [str(text) for text in examples['text']],
+                truncation=True,
+                max_length=max_length
+            ),
+            batched=True,
+            num_proc=self.config.get('preprocessing_num_workers', 4),
+            remove_columns=['text']
         )
+        train_dataset, val_dataset = dataset['train'], dataset['test']
         
         print(f"📈 训练集大小: {len(train_dataset)}")
         print(f"📈 验证集大小: {len(val_dataset)}")
@@ -131,6 +108,13 @@ class LegalBERTTrainer:
         """开始训练"""
         print("🚀 开始训练BERT模型...")
         
+        # 混合精度与编译选项按硬件能力开启：bf16需要Ampere及以上GPU，
+        # torch.compile与fused AdamW需要PyTorch 2.x
+        use_cuda = torch.cuda.is_available()
+        bf16_supported = use_cuda and torch.cuda.is_bf16_supported()
+        torch2 = hasattr(torch, "compile")
+        use_compile = use_cuda and torch2 and self.config.get('torch_compile', True)
+        
         # 训练参数
         training_args = TrainingArguments(
             output_dir=self.config.get('output_dir', './models/trained'),
@@ -146,6 +130,15 @@ class LegalBERTTrainer:
             load_best_model_at_end=True,
             metric_for_best_model="f1",
             greater_is_better=True,
+            bf16=bf16_supported,
+            tf32=bf16_supported,
+            optim="adamw_torch_fused" if use_cuda and torch2 else "adamw_torch",
+            gradient_checkpointing=self.config.get('gradient_checkpointing', False),
+            torch_compile=use_compile,
+            torch_compile_backend="inductor" if use_compile else None,
+            dataloader_num_workers=self.config.get('dataloader_num_workers', 4),
+            dataloader_pin_memory=use_cuda,
+            group_by_length=True,
         )
         
         # 创建训练器
@@ -155,6 +148,7 @@ class LegalBERTTrainer:
             train_dataset=train_dataset,
             eval_dataset=val_dataset,
             compute_metrics=self.compute_metrics,
+            data_collator=DataCollatorWithPadding(self.tokenizer, pad_to_multiple_of=8),
         )
         
         # 开始训练
@@ -172,32 +166,155 @@ class LegalBERTTrainer:
         for key, value in eval_results.items():
             print(f"  {key}: {value:.4f}")
     
-    def predict(self, text: str):
-        """使用训练好的模型进行预测"""
+    def quantize_for_cpu(self, save_path: str = None):
+        """对推理模型做INT8动态量化（Linear层），用于CPU推理
+        
+        训练用的FP32模型保持不变，量化模型只替换推理路径；
+        提供save_path时另存量化后的state_dict。
+        """
+        if self.model is None:
+            raise ValueError("模型未加载，请先训练或加载模型")
+        
+        self.model.eval()
+        quantized = torch.quantization.quantize_dynamic(
+            copy.deepcopy(self.model).cpu(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        self.inference_model = quantized
+        
+        if save_path:
+            torch.save(quantized.state_dict(), save_path)
+            print(f"💾 INT8量化模型已保存: {save_path}")
+        return quantized
+    
+    def export_onnx(self, onnx_path: str):
+        """导出ONNX模型并创建ONNX Runtime CPU推理会话，之后的预测走ONNX Runtime"""
         if self.model is None or self.tokenizer is None:
             raise ValueError("模型未加载，请先训练或加载模型")
+        import onnxruntime as ort
         
-        # 编码输入
+        model = copy.deepcopy(self.model).cpu().eval()
+        model.config.return_dict = False
+        dummy = self.tokenizer(["示例文本"], return_tensors='pt')
+        torch.onnx.export(
+            model,
+            (dummy['input_ids'], dummy['attention_mask']),
+            onnx_path,
+            opset_version=17,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'}
+            }
+        )
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.onnx_session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        print(f"💾 ONNX模型已导出: {onnx_path}")
+        return self.onnx_session
+    
+    def _get_inference_model(self):
+        """获取推理模型，GPU且PyTorch 2.x时使用torch.compile编译并预热"""
+        if self.inference_model is None:
+            self.model.eval()
+            self.inference_model = self.model
+            if torch.cuda.is_available() and hasattr(torch, "compile") and self.config.get('torch_compile', True):
+                # 训练由Trainer自行编译，这里只编译推理路径，避免保存带_orig_mod前缀的权重
+                self.inference_model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+                # 预热一次，把编译开销放在首个真实请求之前
+                warmup = self.tokenizer(["预热"], padding=True, pad_to_multiple_of=8, return_tensors='pt')
+                with torch.inference_mode():
+                    self.inference_model(**warmup.to(self.model.device))
+        return self.inference_model
+    
+    def predict(self, texts: Union[str, List[str]]):
+        """使用训练好的模型进行预测，传入列表时按批前向计算"""
+        if self.model is None or self.tokenizer is None:
+            raise ValueError("模型未加载，请先训练或加载模型")
+        
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        
+        model = None if self.onnx_session is not None else self._get_inference_model()
+        
+        # 按长度排序后分批，同一批内文本长度接近，减少填充；结果按原顺序返回
+        batch_size = self.config.get('batch_size', 16)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            batch_results = self._predict_batch(model, [texts[i] for i in batch_indices])
+            for i, result in zip(batch_indices, batch_results):
+                results[i] = result
+        
+        return results[0] if single else results
+    
+    def _predict_batch(self, model, texts: List[str]) -> List[Dict[str, Any]]:
+        """对一批文本做一次前向计算"""
+        if self.onnx_session is not None:
+            return self._predict_batch_onnx(texts)
+        
+        # 编码输入，按批内最长文本动态填充（补齐到8的倍数，限制编译模型的形状种类）
         encoding = self.tokenizer(
-            text,
+            texts,
             truncation=True,
-            padding='max_length',
+            padding=True,
+            pad_to_multiple_of=8,
             max_length=self.config.get('max_length', 512),
             return_tensors='pt'
         )
         
+        # 输入拷贝到推理模型所在设备，GPU上经锁页内存异步传输
+        device = next(model.parameters()).device
+        if device.type == "cuda":
+            encoding = {k: v.pin_memory().to(device, non_blocking=True) for k, v in encoding.items()}
+        
         # 预测
-        with torch.no_grad():
-            outputs = self.model(**encoding)
+        with torch.inference_mode():
+            outputs = model(**encoding)
             predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            predicted_class = torch.argmax(predictions, dim=-1).item()
-            confidence = torch.max(predictions).item()
+            confidences, predicted_classes = torch.max(predictions, dim=-1)
         
-        return {
-            'predicted_class': predicted_class,
-            'confidence': confidence,
-            'probabilities': predictions.numpy().tolist()
-        }
+        return [
+            {
+                'predicted_class': predicted_class,
+                'confidence': confidence,
+                'probabilities': [probabilities]
+            }
+            for predicted_class, confidence, probabilities in zip(
+                predicted_classes.tolist(), confidences.tolist(), predictions.tolist()
+            )
+        ]
+
+    def _predict_batch_onnx(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """用ONNX Runtime对一批文本做一次前向计算"""
+        encoding = self.tokenizer(
+            texts,
+            truncation=True,
+            padding=True,
+            max_length=self.config.get('max_length', 512),
+            return_tensors='np'
+        )
+        logits = self.onnx_session.run(['logits'], {
+            'input_ids': encoding['input_ids'].astype(np.int64),
+            'attention_mask': encoding['attention_mask'].astype(np.int64)
+        })[0]
+        
+        # softmax
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        predictions = exp / exp.sum(axis=-1, keepdims=True)
+        
+        return [
+            {
+                'predicted_class': int(probabilities.argmax()),
+                'confidence': float(probabilities.max()),
+                'probabilities': [probabilities.tolist()]
+            }
+            for probabilities in predictions
+        ]
 
 def create_sample_data():
     """创建示例训练数据"""
@@ -271,8 +388,7 @@ def main():
         "商标侵权案件处理"
     ]
     
-    for text in test_texts:
-        result = trainer.predict(text)
+    for text, result in zip(test_texts, trainer.predict(test_texts)):
         print(f"文本: {text}")
         print(f"预测类别: {result['predicted_class']}")
         print(f"置信度: {result['confidence']:.4f}")
@@ -3,26 +3,48 @@ MongoDB知识库服务
 使用MongoDB存储和管理法律知识库
 """
 import asyncio
+from collections import Counter
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
 
+from bson import ObjectId
+from pymongo import UpdateOne
+
 from ..models.mongodb_models import KnowledgeBase, User, LegalConsultation
 from ..database_mongodb import get_mongodb
 
 logger = logging.getLogger(__name__)
 
+# 序列化输出的字段（不含id），列表查询只取这些字段，
+# 跳过law_articles/keywords/entities等大字段
+KNOWLEDGE_FIELDS = (
+    "title", "content", "category", "tags", "source", "version",
+    "is_active", "word_count", "reading_time", "difficulty_level",
+    "view_count", "like_count", "share_count", "created_at", "updated_at"
+)
+KNOWLEDGE_PROJECTION = dict.fromkeys(KNOWLEDGE_FIELDS, 1)
+
 class MongoDBKnowledgeService:
     """MongoDB知识库服务"""
     
     def __init__(self):
-        self.db = get_mongodb()
+        # 浏览次数先在内存中累计，定期合并为一次bulk_write
+        self.view_flush_interval = 5  # 秒
+        self._pending_views: Counter = Counter()
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    @property
+    def db(self):
+        """Motor数据库实例（连接在应用启动后才建立，因此每次取最新的）"""
+        return get_mongodb()
     
     async def create_knowledge(self, knowledge_data: Dict[str, Any]) -> str:
         """创建知识条目"""
         try:
             knowledge = KnowledgeBase(**knowledge_data)
-            knowledge.save()
+            # MongoEngine为同步驱动，放到线程中执行，避免阻塞事件循环
+            await asyncio.to_thread(knowledge.save)
             logger.info(f"知识条目创建成功: {knowledge.title}")
             return str(knowledge.id)
         except Exception as e:
@@ -32,7 +54,9 @@ class MongoDBKnowledgeService:
     async def get_knowledge_by_id(self, knowledge_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取知识条目"""
         try:
-            knowledge = KnowledgeBase.objects(id=knowledge_id).first()
+            knowledge = await self.db.knowledge_base.find_one(
+                {"_id": ObjectId(knowledge_id)}, KNOWLEDGE_PROJECTION
+            )
             if knowledge:
                 return self._serialize_knowledge(knowledge)
             return None
@@ -51,27 +75,20 @@ class MongoDBKnowledgeService:
                 search_filter["category"] = category
             
             if tags:
-                search_filter["tags__in"] = tags
+                search_filter["tags"] = {"$in": tags}
             
             # 执行搜索
             if query:
-                # 使用MongoDB的文本搜索
-                knowledge_items = KnowledgeBase.objects(
-                    __raw__={
-                        "$and": [
-                            search_filter,
-                            {"$text": {"$search": query}}
-                        ]
-                    }
+                # 使用MongoDB的文本搜索，按相关度排序
+                search_filter["$text"] = {"$search": query}
+                projection = {**KNOWLEDGE_PROJECTION, "score": {"$meta": "textScore"}}
+                cursor = self.db.knowledge_base.find(search_filter, projection).sort(
+                    [("score", {"$meta": "textScore"})]
                 ).limit(limit)
             else:
-                knowledge_items = KnowledgeBase.objects(**search_filter).limit(limit)
+                cursor = self.db.knowledge_base.find(search_filter, KNOWLEDGE_PROJECTION).limit(limit)
             
-            results = []
-            for item in knowledge_items:
-                results.append(self._serialize_knowledge(item))
-            
-            return results
+            return [self._serialize_knowledge(item) async for item in cursor]
             
         except Exception as e:
             logger.error(f"搜索知识库失败: {e}")
@@ -80,16 +97,12 @@ class MongoDBKnowledgeService:
     async def get_knowledge_by_category(self, category: str, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
         """根据分类获取知识条目"""
         try:
-            knowledge_items = KnowledgeBase.objects(
-                category=category,
-                is_active=True
+            cursor = self.db.knowledge_base.find(
+                {"category": category, "is_active": True},
+                KNOWLEDGE_PROJECTION
             ).skip(skip).limit(limit)
             
-            results = []
-            for item in knowledge_items:
-                results.append(self._serialize_knowledge(item))
-            
-            return results
+            return [self._serialize_knowledge(item) async for item in cursor]
             
         except Exception as e:
             logger.error(f"获取分类知识失败: {e}")
@@ -98,70 +111,73 @@ class MongoDBKnowledgeService:
     async def update_knowledge(self, knowledge_id: str, update_data: Dict[str, Any]) -> bool:
         """更新知识条目"""
         try:
-            knowledge = KnowledgeBase.objects(id=knowledge_id).first()
-            if not knowledge:
-                return False
-            
-            # 更新字段
-            for key, value in update_data.items():
-                if hasattr(knowledge, key):
-                    setattr(knowledge, key, value)
-            
-            knowledge.updated_at = datetime.utcnow()
-            knowledge.save()
-            
-            logger.info(f"知识条目更新成功: {knowledge.title}")
-            return True
-            
+            return await asyncio.to_thread(self._update_knowledge_sync, knowledge_id, update_data)
         except Exception as e:
             logger.error(f"更新知识条目失败: {e}")
             return False
     
+    def _update_knowledge_sync(self, knowledge_id: str, update_data: Dict[str, Any]) -> bool:
+        """更新知识条目（同步，在工作线程中执行）"""
+        knowledge = KnowledgeBase.objects(id=knowledge_id).first()
+        if not knowledge:
+            return False
+        
+        # 更新字段
+        for key, value in update_data.items():
+            if hasattr(knowledge, key):
+                setattr(knowledge, key, value)
+        
+        knowledge.updated_at = datetime.utcnow()
+        knowledge.save()
+        
+        logger.info(f"知识条目更新成功: {knowledge.title}")
+        return True
+    
     async def delete_knowledge(self, knowledge_id: str) -> bool:
         """删除知识条目（软删除）"""
         try:
-            knowledge = KnowledgeBase.objects(id=knowledge_id).first()
-            if not knowledge:
-                return False
-            
-            knowledge.is_active = False
-            knowledge.save()
-            
-            logger.info(f"知识条目删除成功: {knowledge.title}")
-            return True
-            
+            return await asyncio.to_thread(self._delete_knowledge_sync, knowledge_id)
         except Exception as e:
             logger.error(f"删除知识条目失败: {e}")
             return False
     
+    def _delete_knowledge_sync(self, knowledge_id: str) -> bool:
+        """软删除知识条目（同步，在工作线程中执行）"""
+        knowledge = KnowledgeBase.objects(id=knowledge_id).first()
+        if not knowledge:
+            return False
+        
+        knowledge.is_active = False
+        knowledge.save()
+        
+        logger.info(f"知识条目删除成功: {knowledge.title}")
+        return True
+    
     async def get_knowledge_stats(self) -> Dict[str, Any]:
         """获取知识库统计信息"""
         try:
-            # 总数量
-            total_count = KnowledgeBase.objects(is_active=True).count()
-            
-            # 按分类统计
+            # 总数量、分类统计、热门标签在一次$facet聚合中完成
             pipeline = [
                 {"$match": {"is_active": True}},
-                {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+                {"$facet": {
+                    "total": [{"$count": "n"}],
+                    "by_category": [
+                        {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+                    ],
+                    "top_tags": [
+                        {"$unwind": "$tags"},
+                        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                        {"$sort": {"count": -1}},
+                        {"$limit": 10}
+                    ]
+                }}
             ]
             
-            category_stats = {}
-            for item in self.db.knowledge_base.aggregate(pipeline):
-                category_stats[item["_id"]] = item["count"]
+            facets = (await self.db.knowledge_base.aggregate(pipeline).to_list(length=1))[0]
             
-            # 按标签统计
-            tag_pipeline = [
-                {"$match": {"is_active": True}},
-                {"$unwind": "$tags"},
-                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}},
-                {"$limit": 10}
-            ]
-            
-            top_tags = []
-            for item in self.db.knowledge_base.aggregate(tag_pipeline):
-                top_tags.append({"tag": item["_id"], "count": item["count"]})
+            total_count = facets["total"][0]["n"] if facets["total"] else 0
+            category_stats = {item["_id"]: item["count"] for item in facets["by_category"]}
+            top_tags = [{"tag": item["_id"], "count": item["count"]} for item in facets["top_tags"]]
             
             return {
                 "total_count": total_count,
@@ -177,81 +193,84 @@ class MongoDBKnowledgeService:
     async def get_popular_knowledge(self, limit: int = 10) -> List[Dict[str, Any]]:
         """获取热门知识条目"""
         try:
-            knowledge_items = KnowledgeBase.objects(
-                is_active=True
-            ).order_by('-view_count').limit(limit)
-            
-            results = []
-            for item in knowledge_items:
-                results.append(self._serialize_knowledge(item))
+            cursor = self.db.knowledge_base.find(
+                {"is_active": True}, KNOWLEDGE_PROJECTION
+            ).sort("view_count", -1).limit(limit)
             
-            return results
+            return [self._serialize_knowledge(item) async for item in cursor]
             
         except Exception as e:
             logger.error(f"获取热门知识失败: {e}")
             return []
     
     async def increment_view_count(self, knowledge_id: str) -> bool:
-        """增加浏览次数"""
+        """增加浏览次数（累计后批量写入）"""
         try:
-            knowledge = KnowledgeBase.objects(id=knowledge_id).first()
-            if knowledge:
-                knowledge.view_count += 1
-                knowledge.save()
-                return True
-            return False
+            self._pending_views[ObjectId(knowledge_id)] += 1
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_view_counts_later())
+            return True
         except Exception as e:
             logger.error(f"增加浏览次数失败: {e}")
             return False
     
+    async def _flush_view_counts_later(self):
+        """等待一个刷新周期后写入累计的浏览次数"""
+        await asyncio.sleep(self.view_flush_interval)
+        await self.flush_view_counts()
+    
+    async def flush_view_counts(self) -> int:
+        """将累计的浏览次数以原子$inc批量写入，返回更新的条目数"""
+        if not self._pending_views:
+            return 0
+        pending, self._pending_views = self._pending_views, Counter()
+        try:
+            await self.db.knowledge_base.bulk_write(
+                [UpdateOne({"_id": knowledge_id}, {"$inc": {"view_count": count}})
+                 for knowledge_id, count in pending.items()],
+                ordered=False
+            )
+            return len(pending)
+        except Exception as e:
+            logger.error(f"写入浏览次数失败: {e}")
+            # 写入失败时放回，等待下一次刷新
+            self._pending_views.update(pending)
+            return 0
+    
     async def get_related_knowledge(self, knowledge_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         """获取相关知识条目"""
         try:
-            knowledge = KnowledgeBase.objects(id=knowledge_id).first()
+            object_id = ObjectId(knowledge_id)
+            knowledge = await self.db.knowledge_base.find_one(
+                {"_id": object_id}, {"category": 1, "tags": 1}
+            )
             if not knowledge:
                 return []
             
             # 基于标签和分类查找相关条目
-            related_items = KnowledgeBase.objects(
-                is_active=True,
-                id__ne=knowledge_id,
-                __raw__={
+            cursor = self.db.knowledge_base.find(
+                {
+                    "is_active": True,
+                    "_id": {"$ne": object_id},
                     "$or": [
-                        {"category": knowledge.category},
-                        {"tags": {"$in": knowledge.tags}}
+                        {"category": knowledge.get("category")},
+                        {"tags": {"$in": knowledge.get("tags", [])}}
                     ]
-                }
+                },
+                KNOWLEDGE_PROJECTION
             ).limit(limit)
             
-            results = []
-            for item in related_items:
-                results.append(self._serialize_knowledge(item))
-            
-            return results
+            return [self._serialize_knowledge(item) async for item in cursor]
             
         except Exception as e:
             logger.error(f"获取相关知识失败: {e}")
             return []
     
-    def _serialize_knowledge(self, knowledge: KnowledgeBase) -> Dict[str, Any]:
-        """序列化知识条目"""
+    def _serialize_knowledge(self, knowledge: Dict[str, Any]) -> Dict[str, Any]:
+        """序列化知识条目（PyMongo原始文档），时间字段保留datetime，由ORJSONResponse编码"""
         return {
-            "id": str(knowledge.id),
-            "title": knowledge.title,
-            "content": knowledge.content,
-            "category": knowledge.category,
-            "tags": knowledge.tags,
-            "source": knowledge.source,
-            "version": knowledge.version,
-            "is_active": knowledge.is_active,
-            "word_count": knowledge.word_count,
-            "reading_time": knowledge.reading_time,
-            "difficulty_level": knowledge.difficulty_level,
-            "view_count": knowledge.view_count,
-            "like_count": knowledge.like_count,
-            "share_count": knowledge.share_count,
-            "created_at": knowledge.created_at.isoformat() if knowledge.created_at else None,
-            "updated_at": knowledge.updated_at.isoformat() if knowledge.updated_at else None
+            "id": str(knowledge["_id"]),
+            **{field: knowledge.get(field) for field in KNOWLEDGE_FIELDS}
         }
 
 # 全局MongoDB知识库服务实例
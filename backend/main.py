@@ -4,6 +4,7 @@ AI法律服务生态链系统 - 主服务入口
 """
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
 import uvicorn
@@ -13,6 +14,7 @@ from dotenv import load_dotenv
 from app.database import init_db
 from app.database_mongodb import init_mongodb, close_mongodb
 from app.routers import auth, legal_ai, knowledge_base, ecosystem, analytics
+from app.services.mongodb_knowledge_service import mongodb_knowledge_service
 from app.core.config import settings
 from app.core.security import verify_token
 
@@ -28,7 +30,8 @@ async def lifespan(app: FastAPI):
     await init_db()
     await init_mongodb()
     yield
-    # 关闭时清理资源
+    # 关闭时清理资源：先写入尚在缓冲中的浏览次数，再关闭MongoDB连接
+    await mongodb_knowledge_service.flush_view_counts()
     await close_mongodb()
 
 # 创建FastAPI应用
@@ -36,7 +39,9 @@ app = FastAPI(
     title="AI法律服务生态链系统",
     description="基于DeepSeek R1和BERT的法律智能服务平台",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # 使用orjson序列化响应，datetime等类型在C层完成编码
+    default_response_class=ORJSONResponse
 )
 
 # CORS中间件配置
@@ -90,10 +95,17 @@ async def health_check():
     return {"status": "healthy", "service": "AI法律服务生态链"}
 
 if __name__ == "__main__":
+    # 开发模式（DEBUG=true）热重载并输出访问日志；生产模式按 LAWLLM_WORKERS 启动工作进程
+    # （默认1个：每个进程都会加载一份模型、初始化数据库并持有各自的内存缓存），
+    # 已安装uvloop/httptools时由uvicorn自动选用
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=settings.DEBUG,
+        workers=None if settings.DEBUG else int(os.environ.get("LAWLLM_WORKERS", "1")),
+        loop="auto",
+        http="auto",
+        access_log=settings.DEBUG,
+        log_level="info" if settings.DEBUG else "warning"
     )
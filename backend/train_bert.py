@@ -7,6 +7,8 @@ import sys
 import argparse
 from pathlib import Path
 
+import torch
+
 # 添加项目路径
 sys.path.append(str(Path(__file__).parent))
 
@@ -29,6 +31,12 @@ def main():
                        help='最大文本长度')
     parser.add_argument('--collect_data', action='store_true',
                        help='是否先收集数据')
+    parser.add_argument('--onnx', action='store_true',
+                       help='导出ONNX模型，测试预测使用ONNX Runtime（需要安装onnxruntime）')
+    parser.add_argument('--no_quantize', action='store_true',
+                       help='CPU上测试预测时不使用INT8动态量化模型')
+    parser.add_argument('--no_compile', action='store_true',
+                       help='不使用torch.compile编译训练与推理（默认在GPU + PyTorch 2.x上开启）')
     
     args = parser.parse_args()
     
@@ -56,7 +64,8 @@ def main():
         'batch_size': args.batch_size,
         'learning_rate': args.learning_rate,
         'warmup_steps': 500,
-        'output_dir': args.output_dir
+        'output_dir': args.output_dir,
+        'torch_compile': not args.no_compile
     }
     
     # 创建训练器
@@ -73,6 +82,13 @@ def main():
     
     print("\n✅ 训练完成！")
     print(f"📁 模型保存在: {args.output_dir}")
+    
+    # 测试预测可改用ONNX Runtime；否则无GPU时使用INT8动态量化模型，FP32模型与量化权重都保留
+    if args.onnx:
+        trainer.export_onnx(os.path.join(args.output_dir, 'model.onnx'))
+    elif not args.no_quantize and not torch.cuda.is_available():
+        trainer.quantize_for_cpu(os.path.join(args.output_dir, 'model_int8.pt'))
+    
     print("\n🧪 测试模型:")
     
     # 测试预测
@@ -82,15 +98,18 @@ def main():
         "侵犯他人知识产权应当承担法律责任"
     ]
     
-    for text in test_cases:
-        try:
-            result = trainer.predict(text)
-            print(f"文本: {text}")
-            print(f"预测类别: {result['predicted_class']}")
-            print(f"置信度: {result['confidence']:.4f}")
-            print("-" * 50)
-        except Exception as e:
-            print(f"预测失败: {e}")
+    # 全部测试文本一次批量预测
+    try:
+        results = trainer.predict(test_cases)
+    except Exception as e:
+        print(f"预测失败: {e}")
+        return
+    
+    for text, result in zip(test_cases, results):
+        print(f"文本: {text}")
+        print(f"预测类别: {result['predicted_class']}")
+        print(f"置信度: {result['confidence']:.4f}")
+        print("-" * 50)
 
 if __name__ == "__main__":
     main()
@@ -6,16 +6,18 @@
 import os
 import sys
 import asyncio
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
+import aiohttp
+from bs4 import BeautifulSoup, SoupStrainer
+import orjson
+import csv
 import logging
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Tuple
-import pandas as pd
+import numpy as np
 import jieba
 from collections import Counter
+from functools import lru_cache
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -24,9 +26,39 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 页面中只构建选择器可能命中的元素（标题/段落标签或带对应class的元素）
+_TARGET_TAGS = frozenset({'h1', 'h2', 'h3', 'p'})
+_TARGET_CLASSES = frozenset({
+    'title', 'news-title', 'article-title',
+    'content', 'article-content', 'news-content', 'text'
+})
+
+def _is_target_tag(name, attrs) -> bool:
+    """SoupStrainer过滤函数，解析阶段跳过无关元素"""
+    if name in _TARGET_TAGS:
+        return True
+    classes = attrs.get('class') or ''
+    if isinstance(classes, str):
+        classes = classes.split()
+    return not _TARGET_CLASSES.isdisjoint(classes)
+
+HTML_STRAINER = SoupStrainer(_is_target_tag)
+
+# 关键词提取的停用词
+_STOP_WORDS = frozenset({
+    '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上',
+    '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'
+})
+
 class DISCLawDataCollector:
     """基于DISC-LawLLM架构的法律数据收集器"""
     
+    # 收集数据的字段（CSV列顺序）
+    _CSV_FIELDS = (
+        "text", "title", "content", "source", "region", "category",
+        "confidence", "timestamp", "url", "word_count", "keywords"
+    )
+    
     def __init__(self, output_dir="data/disc_law_data"):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
@@ -43,6 +75,19 @@ class DISCLawDataCollector:
         
         self.collected_data = []
         
+        # jieba词典在后台线程加载，与网页抓取并行，批量分词时无需再等待加载
+        threading.Thread(target=jieba.initialize, daemon=True).start()
+        
+        # 并发抓取设置
+        self.max_concurrency = 5  # 同时进行的请求数
+        self.request_delay = 1  # 每个并发槽位两次请求之间的间隔（秒）
+        self.request_timeout = 15
+        self.max_page_bytes = 2 * 1024 * 1024  # 单页最多读取的字节数，超出部分不下载
+        self.max_retries = 2  # 连接失败/超时的重试次数
+        self.retry_backoff = 0.3  # 重试退避基数（秒）
+        # 所有抓取共用的HTTP会话（连接池 + keep-alive），首次请求时在事件循环内创建
+        self.session = None
+        
         # 粤港澳大湾区法律分类体系（参考DISC-LawLLM）
         self.legal_categories = {
             "民事": {
@@ -86,8 +131,31 @@ class DISCLawDataCollector:
                 "subcategories": ["其他法律", "综合法律", "特殊法律"]
             }
         }
+        
+        # 分类打分表：去重后的词条列表 + 词条×类别的权重矩阵
+        self._category_names = list(self.legal_categories.keys())
+        self._category_to_id = {category: i for i, category in enumerate(self._category_names)}
+        self._score_terms, self._score_weights = self._build_score_table()
+        
+        # 不同页面常有重复的标题（导航、页脚等），分类结果按文本缓存
+        self._classify = lru_cache(maxsize=50000)(self._classify_legal_text)
+    
+    def _build_score_table(self) -> Tuple[List[str], np.ndarray]:
+        """把分类体系展平为词条表，关键词权重1，子类别权重2"""
+        term_index: Dict[str, int] = {}
+        entries = []
+        for category_id, info in enumerate(self.legal_categories.values()):
+            for terms, weight in ((info['keywords'], 1), (info['subcategories'], 2)):
+                for term in terms:
+                    term_id = term_index.setdefault(term, len(term_index))
+                    entries.append((term_id, category_id, weight))
+        
+        weights = np.zeros((len(term_index), len(self.legal_categories)), dtype=np.int32)
+        for term_id, category_id, weight in entries:
+            weights[term_id, category_id] += weight
+        return list(term_index), weights
     
-    def collect_gba_court_data(self):
+    async def collect_gba_court_data(self):
         """收集粤港澳大湾区法院数据"""
         logger.info("🏛️ 开始收集粤港澳大湾区法院数据...")
         
@@ -185,93 +253,169 @@ class DISCLawDataCollector:
             }
         ]
         
-        for court in gba_courts:
-            try:
-                logger.info(f"📡 正在收集: {court['name']} ({court['region']})")
-                self._scrape_court_website(court)
-                time.sleep(3)  # 避免请求过快
-            except Exception as e:
-                logger.error(f"收集失败 {court['name']}: {e}")
+        # 并发抓取所有页面，全部返回后再逐个解析
+        pages = await self._fetch_pages([court['url'] for court in gba_courts])
+        
+        for court, page in zip(gba_courts, pages):
+            if isinstance(page, Exception):
+                logger.error(f"收集失败 {court['name']}: {page}")
+                continue
+            logger.info(f"📡 正在解析: {court['name']} ({court['region']})")
+            self._scrape_court_website(court, page)
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共用的HTTP会话"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+                connector=aiohttp.TCPConnector(limit=20, limit_per_host=self.max_concurrency)
+            )
+        return self.session
+    
+    async def close(self):
+        """关闭HTTP会话"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+    
+    async def _fetch_pages(self, urls: List[str]) -> List[Any]:
+        """并发获取多个页面，失败的页面以异常对象返回"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        session = self._get_session()
+        
+        async def fetch(url: str) -> bytes:
+            async with semaphore:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        logger.info(f"📡 正在请求: {url}")
+                        async with session.get(url) as response:
+                            page = await self._read_page(response)
+                        break
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                        if attempt == self.max_retries:
+                            raise
+                        await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                await asyncio.sleep(self.request_delay)  # 避免请求过快
+                return page
+        
+        return await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+    
+    async def _read_page(self, response: aiohttp.ClientResponse) -> bytes:
+        """分块读取响应体，达到max_page_bytes后停止下载"""
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_page_bytes:
+                logger.warning(f"页面超过 {self.max_page_bytes} 字节，已截断: {response.url}")
+                break
+        return b"".join(chunks)
     
-    def _scrape_court_website(self, court_config):
-        """爬取单个法院网站"""
+    def _scrape_court_website(self, court_config, page: bytes):
+        """解析单个法院网站页面"""
         try:
-            response = requests.get(court_config['url'], timeout=15, headers=self.headers)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._parse_page(page)
+            # 同一页面的数据共用一个采集时间
+            timestamp = datetime.now().isoformat()
             
             # 提取标题和内容
             titles = soup.select(court_config['selectors']['title'])
             contents = soup.select(court_config['selectors']['content'])
             
             for title, content in zip(titles, contents):
-                if title.text.strip() and content.text.strip():
+                # 每个元素只取一次文本
+                title_text = title.get_text().strip()
+                content_text = content.get_text().strip()
+                if title_text and content_text:
                     # 使用DISC-LawLLM的分类方法
-                    category, confidence = self._classify_legal_text(title.text.strip())
+                    category, confidence = self._classify(title_text)
+                    raw_text = title_text + content_text
                     
                     data = {
-                        "text": f"{title.text.strip()} {content.text.strip()}",
-                        "title": title.text.strip(),
-                        "content": content.text.strip(),
+                        "text": f"{title_text} {content_text}",
+                        "title": title_text,
+                        "content": content_text,
                         "source": court_config['name'],
                         "region": court_config['region'],
                         "category": category,
                         "confidence": confidence,
-                        "timestamp": datetime.now().isoformat(),
+                        "timestamp": timestamp,
                         "url": court_config['url'],
-                        "word_count": len(title.text.strip() + content.text.strip()),
-                        "keywords": self._extract_keywords(title.text.strip() + content.text.strip())
+                        "word_count": len(raw_text),
+                        # 关键词在全部收集完成后批量提取
+                        "_raw": raw_text
                     }
                     self.collected_data.append(data)
-                    logger.info(f"✅ 收集到: {title.text.strip()[:50]}... (类别: {category})")
+                    logger.info(f"✅ 收集到: {title_text[:50]}... (类别: {category})")
                     
         except Exception as e:
             logger.error(f"爬取失败 {court_config['name']}: {e}")
     
+    def _parse_page(self, page: bytes) -> BeautifulSoup:
+        """用lxml解析页面原始字节，只保留目标元素"""
+        return BeautifulSoup(page, 'lxml', parse_only=HTML_STRAINER, from_encoding='utf-8')
+    
     def _classify_legal_text(self, text: str) -> Tuple[str, float]:
         """使用DISC-LawLLM方法分类法律文本"""
         text_lower = text.lower()
-        category_scores = {}
         
-        for category, info in self.legal_categories.items():
-            score = 0
-            keywords = info['keywords']
-            
-            # 计算关键词匹配分数
-            for keyword in keywords:
-                if keyword in text_lower:
-                    score += 1
-            
-            # 计算子类别匹配分数
-            for subcategory in info['subcategories']:
-                if subcategory in text_lower:
-                    score += 2
-            
-            category_scores[category] = score
+        # 每个词条只做一次子串匹配，命中向量乘权重矩阵得到各类别分数
+        hits = np.fromiter((term in text_lower for term in self._score_terms),
+                           dtype=np.int32, count=len(self._score_terms))
+        category_scores = hits @ self._score_weights
         
         # 找到最高分的类别
-        best_category = max(category_scores, key=category_scores.get)
-        max_score = category_scores[best_category]
+        best_index = int(category_scores.argmax())
+        best_category = self._category_names[best_index]
+        max_score = int(category_scores[best_index])
         
         # 计算置信度
-        total_score = sum(category_scores.values())
+        total_score = int(category_scores.sum())
         confidence = max_score / total_score if total_score > 0 else 0.0
         
         return best_category, confidence
     
-    def _extract_keywords(self, text: str) -> List[str]:
-        """提取关键词"""
-        # 使用jieba分词
-        words = jieba.lcut(text)
-        
+    def _top_keywords(self, words: List[str]) -> List[str]:
+        """从分词结果中选出关键词"""
         # 过滤停用词和短词
-        stop_words = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'}
-        keywords = [word for word in words if len(word) > 1 and word not in stop_words]
+        keywords = [word for word in words if len(word) > 1 and word not in _STOP_WORDS]
         
         # 返回最常见的10个关键词
         return [word for word, count in Counter(keywords).most_common(10)]
     
-    def collect_legal_news(self):
+    def extract_all_keywords(self):
+        """对收集到的全部数据批量分词并提取关键词
+        
+        所有待处理文本按行拼接后只调用一次jieba；重复文本只分词一次。
+        """
+        pending = [item for item in self.collected_data if '_raw' in item]
+        if not pending:
+            return
+        
+        # 去重后每条文本占一行，文本内部的换行替换为空格（不影响分词结果中的关键词）
+        texts = list(dict.fromkeys(item['_raw'] for item in pending))
+        corpus = "\n".join(text.replace("\r", " ").replace("\n", " ") for text in texts)
+        
+        words = jieba.lcut(corpus)
+        
+        # 按换行符把分词结果切回各条文本
+        keywords_by_text = {}
+        text_iter = iter(texts)
+        line_words = []
+        for word in words + ["\n"]:
+            if word == "\n":
+                keywords_by_text[next(text_iter)] = self._top_keywords(line_words)
+                line_words = []
+            else:
+                line_words.append(word)
+        
+        for item in pending:
+            item['keywords'] = keywords_by_text[item.pop('_raw')]
+        
+        logger.info(f"🔤 批量提取关键词完成: {len(texts)} 条文本")
+    
+    async def collect_legal_news(self):
         """收集法律新闻数据"""
         logger.info("📰 开始收集法律新闻数据...")
         
@@ -303,45 +447,51 @@ class DISCLawDataCollector:
             }
         ]
         
-        for site in news_sites:
-            try:
-                logger.info(f"📡 正在收集: {site['name']}")
-                self._scrape_news_website(site)
-                time.sleep(2)
-            except Exception as e:
-                logger.error(f"收集失败 {site['name']}: {e}")
+        pages = await self._fetch_pages([site['url'] for site in news_sites])
+        
+        for site, page in zip(news_sites, pages):
+            if isinstance(page, Exception):
+                logger.error(f"收集失败 {site['name']}: {page}")
+                continue
+            logger.info(f"📡 正在解析: {site['name']}")
+            self._scrape_news_website(site, page)
     
-    def _scrape_news_website(self, site_config):
-        """爬取新闻网站"""
+    def _scrape_news_website(self, site_config, page: bytes):
+        """解析新闻网站页面"""
         try:
-            response = requests.get(site_config['url'], timeout=15, headers=self.headers)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._parse_page(page)
+            # 同一页面的数据共用一个采集时间
+            timestamp = datetime.now().isoformat()
             
             # 提取标题和内容
             titles = soup.select(site_config['selectors']['title'])
             contents = soup.select(site_config['selectors']['content'])
             
             for title, content in zip(titles, contents):
-                if title.text.strip() and content.text.strip():
+                # 每个元素只取一次文本
+                title_text = title.get_text().strip()
+                content_text = content.get_text().strip()
+                if title_text and content_text:
                     # 使用DISC-LawLLM的分类方法
-                    category, confidence = self._classify_legal_text(title.text.strip())
+                    category, confidence = self._classify(title_text)
+                    raw_text = title_text + content_text
                     
                     data = {
-                        "text": f"{title.text.strip()} {content.text.strip()}",
-                        "title": title.text.strip(),
-                        "content": content.text.strip(),
+                        "text": f"{title_text} {content_text}",
+                        "title": title_text,
+                        "content": content_text,
                         "source": site_config['name'],
                         "region": "粤港澳大湾区",
                         "category": category,
                         "confidence": confidence,
-                        "timestamp": datetime.now().isoformat(),
+                        "timestamp": timestamp,
                         "url": site_config['url'],
-                        "word_count": len(title.text.strip() + content.text.strip()),
-                        "keywords": self._extract_keywords(title.text.strip() + content.text.strip())
+                        "word_count": len(raw_text),
+                        # 关键词在全部收集完成后批量提取
+                        "_raw": raw_text
                     }
                     self.collected_data.append(data)
-                    logger.info(f"✅ 收集到新闻: {title.text.strip()[:50]}... (类别: {category})")
+                    logger.info(f"✅ 收集到新闻: {title_text[:50]}... (类别: {category})")
                     
         except Exception as e:
             logger.error(f"爬取失败 {site_config['name']}: {e}")
@@ -365,56 +515,54 @@ class DISCLawDataCollector:
         
         # 保存训练数据
         training_file = os.path.join(self.output_dir, "disc_law_training_data.json")
-        with open(training_file, 'w', encoding='utf-8') as f:
-            json.dump(training_data, f, ensure_ascii=False, indent=2)
+        with open(training_file, 'wb') as f:
+            f.write(orjson.dumps(training_data))
         
         logger.info(f"训练数据已保存到: {training_file}")
         return training_data
     
     def _get_category_id(self, category: str) -> int:
         """获取类别ID"""
-        category_list = list(self.legal_categories.keys())
-        return category_list.index(category) if category in category_list else len(category_list) - 1
+        return self._category_to_id.get(category, len(self._category_to_id) - 1)
     
     def save_data(self):
         """保存收集的数据"""
         logger.info("💾 保存收集的数据...")
         
-        # 保存为JSON格式
-        json_file = os.path.join(self.output_dir, "disc_law_data.json")
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(self.collected_data, f, ensure_ascii=False, indent=2)
+        # 保存前补齐关键词
+        self.extract_all_keywords()
         
-        # 保存为CSV格式
-        df = pd.DataFrame(self.collected_data)
+        # 一次遍历同时写出JSON、CSV、TXT（用于BERT训练）三种格式并统计
+        json_file = os.path.join(self.output_dir, "disc_law_data.json")
         csv_file = os.path.join(self.output_dir, "disc_law_data.csv")
-        df.to_csv(csv_file, index=False, encoding='utf-8-sig')
-        
-        # 保存为TXT格式（用于BERT训练）
         txt_file = os.path.join(self.output_dir, "disc_law_data.txt")
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            for item in self.collected_data:
-                f.write(f"{item['text']}\n")
+        region_stats = Counter()
+        category_stats = Counter()
+        
+        with open(json_file, 'wb') as json_f, \
+                open(csv_file, 'w', newline='', encoding='utf-8-sig') as csv_f, \
+                open(txt_file, 'w', encoding='utf-8') as txt_f:
+            writer = csv.DictWriter(csv_f, fieldnames=self._CSV_FIELDS)
+            writer.writeheader()
+            
+            json_f.write(b"[")
+            for i, item in enumerate(self.collected_data):
+                if i:
+                    json_f.write(b",")
+                json_f.write(orjson.dumps(item))
+                writer.writerow(item)
+                txt_f.write(f"{item['text']}\n")
+                region_stats[item.get('region', '未知')] += 1
+                category_stats[item.get('category', '未知')] += 1
+            json_f.write(b"]")
         
         logger.info(f"✅ 数据已保存到: {self.output_dir}")
         logger.info(f"📊 总共收集了 {len(self.collected_data)} 条数据")
         
-        # 按地区统计
-        region_stats = {}
-        for item in self.collected_data:
-            region = item.get('region', '未知')
-            region_stats[region] = region_stats.get(region, 0) + 1
-        
         logger.info("\n📈 按地区统计:")
         for region, count in region_stats.items():
             logger.info(f"  {region}: {count} 条")
         
-        # 按类别统计
-        category_stats = {}
-        for item in self.collected_data:
-            category = item.get('category', '未知')
-            category_stats[category] = category_stats.get(category, 0) + 1
-        
         logger.info("\n📈 按类别统计:")
         for category, count in category_stats.items():
             logger.info(f"  {category}: {count} 条")
@@ -433,11 +581,11 @@ async def main():
     try:
         # 1. 收集法院数据
         logger.info("\n1. 收集粤港澳大湾区法院数据...")
-        collector.collect_gba_court_data()
+        await collector.collect_gba_court_data()
         
         # 2. 收集法律新闻
         logger.info("\n2. 收集法律新闻...")
-        collector.collect_legal_news()
+        await collector.collect_legal_news()
         
         # 3. 保存数据
         logger.info("\n3. 保存数据...")
@@ -449,6 +597,7 @@ async def main():
     except Exception as e:
         logger.error(f"数据收集失败: {e}")
     finally:
+        await collector.close()
         logger.info("\n📊 收集统计:")
         logger.info(f"总数据量: {len(collector.collected_data)} 条")
 
@@ -7,25 +7,91 @@ import os
 import sys
 import subprocess
 import platform
-import urllib.request
+import hashlib
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import requests
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+MONGODB_URL = "mongodb://127.0.0.1:27017"
+
+# 分段并发下载的段数和写盘块大小
+DOWNLOAD_PARTS = 8
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
 def check_mongodb_installed():
-    """检查MongoDB是否已安装"""
+    """检查MongoDB是否已安装：先用pymongo ping本地实例，未运行时再查询Windows服务注册表（不启动mongod进程）"""
     try:
-        result = subprocess.run(["mongod", "--version"], capture_output=True, text=True)
-        if result.returncode == 0:
-            print("✅ MongoDB已安装")
-            print(f"版本: {result.stdout.split()[2]}")
-            return True
-    except FileNotFoundError:
+        # 正在运行的实例（含非服务方式安装、非Windows主机）直接视为已安装
+        with MongoClient(MONGODB_URL, serverSelectionTimeoutMS=1000) as client:
+            client.admin.command("ping")
+        print("✅ MongoDB已安装")
+        print(f"运行中的实例: {MONGODB_URL}")
+        return True
+    except PyMongoError:
+        pass
+    
+    try:
+        import winreg
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Services\MongoDB") as key:
+            image_path, _ = winreg.QueryValueEx(key, "ImagePath")
+        print("✅ MongoDB已安装")
+        print(f"服务程序: {image_path}")
+        return True
+    except (ImportError, OSError):
         pass
     
     print("❌ MongoDB未安装")
     return False
 
+def _download_range(url, path, start, end):
+    """下载一个字节区间并写入文件对应偏移"""
+    headers = {"Range": f"bytes={start}-{end}"}
+    with requests.get(url, headers=headers, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        with open(path, "r+b") as f:
+            f.seek(start)
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+
+def _download_file(url, path):
+    """服务器支持Range时分段并发下载，否则单连接流式下载"""
+    head = requests.head(url, allow_redirects=True, timeout=30)
+    head.raise_for_status()
+    size = int(head.headers.get("Content-Length", 0))
+    
+    if size and head.headers.get("Accept-Ranges") == "bytes":
+        # 预分配文件，各段写入各自偏移
+        with open(path, "wb") as f:
+            f.truncate(size)
+        part_size = -(-size // DOWNLOAD_PARTS)
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_download_range, head.url, path, a, b) for a, b in ranges]
+            for future in futures:
+                future.result()
+    else:
+        with requests.get(url, stream=True, timeout=60) as resp:
+            resp.raise_for_status()
+            with open(path, "wb") as f:
+                shutil.copyfileobj(resp.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+
+def _verify_sha256(url, path):
+    """与MongoDB发布的.sha256校验文件比对"""
+    resp = requests.get(url + ".sha256", timeout=30)
+    resp.raise_for_status()
+    expected = resp.text.split()[0].lower()
+    
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest() == expected
+
 def download_mongodb_windows():
     """下载MongoDB for Windows"""
     print("开始下载MongoDB...")
@@ -36,7 +102,14 @@ def download_mongodb_windows():
     
     try:
         print("正在下载MongoDB安装包...")
-        urllib.request.urlretrieve(mongodb_url, download_path)
+        _download_file(mongodb_url, download_path)
+        
+        print("正在校验安装包SHA256...")
+        if not _verify_sha256(mongodb_url, download_path):
+            print("❌ MongoDB安装包校验失败")
+            os.remove(download_path)
+            return None
+        
         print("✅ MongoDB安装包下载完成")
         return download_path
     except Exception as e:
@@ -67,13 +140,12 @@ def setup_mongodb_data_directory():
     """设置MongoDB数据目录"""
     print("设置MongoDB数据目录...")
     
-    # 创建数据目录
+    # 创建数据目录和日志目录，已存在时跳过
     data_dir = Path("C:/data/db")
-    data_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 创建日志目录
     log_dir = Path("C:/data/log")
-    log_dir.mkdir(parents=True, exist_ok=True)
+    for directory in (data_dir, log_dir):
+        if not directory.is_dir():
+            directory.mkdir(parents=True, exist_ok=True)
     
     print(f"✅ 数据目录: {data_dir}")
     print(f"✅ 日志目录: {log_dir}")
@@ -103,50 +175,34 @@ def test_mongodb_connection():
     print("测试MongoDB连接...")
     
     try:
-        # 使用mongo客户端测试连接
-        result = subprocess.run([
-            "mongo", "--eval", "db.runCommand('ping')"
-        ], capture_output=True, text=True, timeout=10)
-        
-        if result.returncode == 0:
-            print("✅ MongoDB连接测试成功")
-            return True
-        else:
-            print(f"❌ MongoDB连接测试失败: {result.stderr}")
-            return False
-    except Exception as e:
+        # 直接用pymongo发送ping命令，不启动mongo shell进程
+        with MongoClient(MONGODB_URL, serverSelectionTimeoutMS=1000) as client:
+            client.admin.command("ping")
+        print("✅ MongoDB连接测试成功")
+        return True
+    except PyMongoError as e:
         print(f"❌ MongoDB连接测试失败: {e}")
         return False
 
 def create_mongodb_user():
-    """创建MongoDB用户"""
+    """创建MongoDB用户（已存在时跳过）"""
     print("创建MongoDB用户...")
     
     try:
-        # 创建管理员用户
-        create_admin_script = """
-        use admin;
-        db.createUser({
-            user: "law_ai_admin",
-            pwd: "law_ai_password",
-            roles: ["userAdminAnyDatabase", "dbAdminAnyDatabase", "readWriteAnyDatabase"]
-        });
-        """
-        
-        with open("create_admin.js", "w") as f:
-            f.write(create_admin_script)
-        
-        result = subprocess.run([
-            "mongo", "admin", "create_admin.js"
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print("✅ MongoDB管理员用户创建成功")
-            return True
-        else:
-            print(f"❌ MongoDB用户创建失败: {result.stderr}")
-            return False
-    except Exception as e:
+        with MongoClient(MONGODB_URL, serverSelectionTimeoutMS=1000) as client:
+            if client.admin.command("usersInfo", "law_ai_admin")["users"]:
+                print("✅ MongoDB管理员用户已存在")
+                return True
+            
+            # 创建管理员用户
+            client.admin.command(
+                "createUser", "law_ai_admin",
+                pwd="law_ai_password",
+                roles=["userAdminAnyDatabase", "dbAdminAnyDatabase", "readWriteAnyDatabase"]
+            )
+        print("✅ MongoDB管理员用户创建成功")
+        return True
+    except PyMongoError as e:
         print(f"❌ MongoDB用户创建失败: {e}")
         return False
 
@@ -176,10 +232,14 @@ security:
 """
     
     config_path = Path("mongod.conf")
-    with open(config_path, "w") as f:
-        f.write(config_content)
-    
-    print(f"✅ MongoDB配置文件: {config_path.absolute()}")
+    new_content = config_content.encode()
+    existing = config_path.read_bytes() if config_path.exists() else b""
+    # 内容未变化时不重写文件
+    if hashlib.sha256(new_content).digest() != hashlib.sha256(existing).digest():
+        config_path.write_bytes(new_content)
+        print(f"✅ MongoDB配置文件: {config_path.absolute()}")
+    else:
+        print(f"✅ MongoDB配置文件已是最新: {config_path.absolute()}")
 
 def main():
     """主函数"""
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+启动脚本共用的工具函数
+"""
+import os
+import sys
+import shutil
+import hashlib
+import subprocess
+import importlib.util
+from pathlib import Path
+
+# 已安装依赖的requirements.txt摘要，未变化时跳过pip install
+REQUIREMENTS_HASH_FILE = Path.home() / ".cache" / "lawllm" / "req.sha"
+
+def requirements_digest(path="requirements.txt"):
+    """requirements.txt内容与当前解释器路径的摘要（不同虚拟环境分别记录）"""
+    digest = hashlib.sha256(Path(path).read_bytes())
+    digest.update(sys.executable.encode())
+    return digest.hexdigest()
+
+def requirements_installed(digest):
+    """上次成功安装时的摘要与当前一致，且本地 pip check 通过"""
+    if not REQUIREMENTS_HASH_FILE.exists() or REQUIREMENTS_HASH_FILE.read_text().strip() != digest:
+        return False
+    # 依赖可能在安装后被改动，用本地的 pip check 确认环境完整
+    check = subprocess.run([sys.executable, "-m", "pip", "check"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return check.returncode == 0
+
+def mark_requirements_installed(digest):
+    """记录本次成功安装的摘要"""
+    REQUIREMENTS_HASH_FILE.parent.mkdir(parents=True, exist_ok=True)
+    REQUIREMENTS_HASH_FILE.write_text(digest)
+
+def pip_install_command():
+    """安装命令：优先使用uv（并行下载、全局wheel缓存），未安装时退回pip"""
+    uv = shutil.which("uv")
+    if uv:
+        return [uv, "pip", "install", "--python", sys.executable]
+    return [sys.executable, "-m", "pip", "install"]
+
+def uvicorn_command(python=sys.executable):
+    """后端启动命令：LAWLLM_DEV=1 时启用 --reload，否则按生产模式启动（可用时使用uvloop/httptools）
+
+    uvloop/httptools 按当前解释器判断是否可用，python 应与当前解释器为同一环境
+    """
+    command = [python, "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"]
+    if os.environ.get("LAWLLM_DEV") == "1":
+        return command + ["--reload"]
+    # 每个工作进程都会加载一份模型，默认单进程，需要时通过 LAWLLM_WORKERS 调整
+    command += ["--workers", os.environ.get("LAWLLM_WORKERS", "1")]
+    if sys.platform != "win32" and importlib.util.find_spec("uvloop") is not None:
+        command += ["--loop", "uvloop"]
+    if importlib.util.find_spec("httptools") is not None:
+        command += ["--http", "httptools"]
+    return command
@@ -0,0 +1,16 @@
+"""
+初始数据文件
+法律条文、案例、实务文档和演示知识库数据以JSON保存，按需加载
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, List, Dict
+
+import orjson
+
+SEEDS_DIR = Path(__file__).parent
+
+@lru_cache(maxsize=None)
+def load_seed(name: str) -> List[Dict[str, Any]]:
+    """加载并缓存 seeds/<name>.json，多个脚本共享同一份解析结果"""
+    return orjson.loads((SEEDS_DIR / f"{name}.json").read_bytes())
@@ -6,24 +6,117 @@ MongoDB数据库初始化脚本
 import os
 import sys
 import asyncio
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.app.database_mongodb import init_mongodb, close_mongodb
+from backend.app.database_mongodb import init_mongodb, close_mongodb, get_mongodb
 from backend.app.models.mongodb_models import (
-    User, KnowledgeBase, EcosystemPartner, 
-    LegalConsultation, SmartContract
+    User, KnowledgeBase, EcosystemPartner, SmartContract
 )
 from backend.app.core.security import get_password_hash
+from backend.app.core.config import settings
+from pymongo import UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError
+from scripts.seeds import load_seed
 
-async def create_admin_user():
+# 演示知识条目在MongoDB中额外记录的阅读信息：标题 -> (阅读时间/分钟, 难度)，其余字段取自 seeds/demo_knowledge.json
+_KB_READING_INFO = {
+    "民法典合同编要点解析": (3, "intermediate"),
+    "劳动争议处理实务指南": (2, "beginner"),
+    "知识产权保护要点": (2, "intermediate"),
+}
+
+# 初始化账号使用低成本bcrypt轮数，仅在显式设置环境变量时启用，并要求首次登录修改密码
+SEED_FAST_HASH = os.environ.get("LAW_AI_SEED_FAST_HASH") == "1"
+SEED_HASH_ROUNDS = 4
+
+# 演示数据可重复生成，写入时不等待日志落盘；管理员账号仍使用默认写关注
+SEED_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+def seed_collection(collection):
+    """演示数据写入用的集合句柄（仅影响该句柄，不改变连接的默认写关注）"""
+    return collection.with_options(write_concern=SEED_WRITE_CONCERN)
+
+def get_demo_password_hash(password):
+    """初始化账号的密码哈希（放在scripts中，生产代码不会引用）"""
+    if SEED_FAST_HASH:
+        return get_password_hash(password, rounds=SEED_HASH_ROUNDS)
+    return get_password_hash(password)
+
+async def hash_passwords(passwords):
+    """在进程池中并行计算密码哈希，不阻塞事件循环上的其他写入"""
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=min(len(passwords), os.cpu_count() or 1)) as executor:
+        return await asyncio.gather(
+            *(loop.run_in_executor(executor, get_demo_password_hash, pw) for pw in passwords)
+        )
+
+def ignore_duplicate_keys(error):
+    """无序批量写入中的重复键错误（11000）视为已存在，保持幂等；其他错误继续抛出"""
+    write_errors = error.details.get("writeErrors", [])
+    other_errors = [err for err in write_errors if err.get("code") != 11000]
+    if other_errors or error.details.get("writeConcernErrors"):
+        raise error
+    if write_errors:
+        print(f"跳过 {len(write_errors)} 条已存在的文档")
+
+async def insert_missing(collection, model, key, items, build_all=None):
+    """一次查询过滤已存在的文档，其余一次insert_many批量写入，返回(新建, 已存在)的键列表
+    
+    文档仍由MongoEngine模型构造（补齐默认值并校验），读写直接走Motor异步集合；
+    build_all为异步函数，接收待创建的条目列表并返回模型实例列表
+    """
+    keys = [item[key] for item in items]
+    existing = {doc[key] async for doc in collection.find({key: {"$in": keys}}, {key: 1, "_id": 0})}
+    missing = [item for item in items if item[key] not in existing]
+    if missing:
+        instances = await build_all(missing) if build_all else [model(**item) for item in missing]
+        # to_mongo 不做校验，写入前显式校验必填项、choices等约束
+        for instance in instances:
+            instance.validate()
+        docs = [instance.to_mongo().to_dict() for instance in instances]
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            ignore_duplicate_keys(e)
+    return [item[key] for item in missing], [k for k in keys if k in existing]
+
+async def upsert_missing(collection, model, key, items):
+    """以 $setOnInsert 批量upsert，不存在时插入、已存在时不改动，一次bulk_write完成，返回(新建, 已存在)的键列表"""
+    instances = [model(**item) for item in items]
+    for instance in instances:
+        instance.validate()
+    ops = [
+        UpdateOne({key: item[key]}, {"$setOnInsert": instance.to_mongo().to_dict()}, upsert=True)
+        for item, instance in zip(items, instances)
+    ]
+    try:
+        result = await collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        ignore_duplicate_keys(e)
+        upserted = {entry["index"] for entry in e.details.get("upserted", [])}
+    else:
+        upserted = set(result.upserted_ids)
+    created = {items[index][key] for index in upserted}
+    keys = [item[key] for item in items]
+    return [k for k in keys if k in created], [k for k in keys if k not in created]
+
+def print_seed_summary(label, created, existed):
+    """汇总输出一次，避免逐条打印"""
+    if existed:
+        print(f"{label} 已存在: {', '.join(existed)}")
+    if created:
+        print(f"✅ {label} 创建成功: {', '.join(created)}")
+
+async def create_admin_user(db):
     """创建管理员用户"""
     try:
         # 检查是否已存在管理员用户
-        admin_user = User.objects(username="admin").first()
-        if admin_user:
+        if await db.users.find_one({"username": "admin"}, {"_id": 1}):
             print("管理员用户已存在")
             return
         
@@ -31,12 +124,14 @@ async def create_admin_user():
         admin_user = User(
             username="admin",
             email="admin@law-ai.com",
-            hashed_password=get_password_hash("admin123"),
+            hashed_password=get_demo_password_hash("admin123"),
             full_name="系统管理员",
             role="admin",
-            is_active=True
+            is_active=True,
+            must_change_password=SEED_FAST_HASH
         )
-        admin_user.save()
+        admin_user.validate()
+        await db.users.insert_one(admin_user.to_mongo().to_dict())
         
         print("✅ 管理员用户创建成功")
         print("用户名: admin")
@@ -45,7 +140,7 @@ async def create_admin_user():
     except Exception as e:
         print(f"❌ 创建管理员用户失败: {e}")
 
-async def create_demo_users():
+async def create_demo_users(db):
     """创建演示用户"""
     try:
         demo_users = [
@@ -72,124 +167,57 @@ async def create_demo_users():
             }
         ]
         
-        for user_data in demo_users:
-            # 检查用户是否已存在
-            existing_user = User.objects(username=user_data["username"]).first()
-            if existing_user:
-                print(f"用户 {user_data['username']} 已存在")
-                continue
-            
-            # 创建用户
-            user = User(
-                username=user_data["username"],
-                email=user_data["email"],
-                hashed_password=get_password_hash(user_data["password"]),
-                full_name=user_data["full_name"],
-                role=user_data["role"],
-                is_active=True
-            )
-            user.save()
-            print(f"✅ 用户 {user_data['username']} 创建成功")
+        async def build_users(missing):
+            # 只为待创建的用户计算哈希
+            hashes = await hash_passwords([u["password"] for u in missing])
+            return [
+                User(
+                    username=u["username"],
+                    email=u["email"],
+                    hashed_password=hashed_password,
+                    full_name=u["full_name"],
+                    role=u["role"],
+                    is_active=True,
+                    must_change_password=SEED_FAST_HASH
+                )
+                for u, hashed_password in zip(missing, hashes)
+            ]
+        
+        created, existed = await insert_missing(
+            seed_collection(db.users), User, "username", demo_users, build_all=build_users
+        )
+        print_seed_summary("用户", created, existed)
         
         print("✅ 演示用户创建完成")
         
     except Exception as e:
         print(f"❌ 创建演示用户失败: {e}")
 
-async def create_demo_knowledge():
+async def create_demo_knowledge(db):
     """创建演示知识库数据"""
     try:
-        demo_knowledge = [
-            {
-                "title": "民法典合同编要点解析",
-                "content": """
-                民法典合同编是民事法律的重要组成部分，主要规定了合同的订立、履行、变更、解除等内容。
-                
-                主要特点：
-                1. 保护合同当事人的合法权益
-                2. 维护社会经济秩序
-                3. 促进社会主义市场经济的发展
-                
-                重要条文：
-                - 第四百六十九条：合同的内容由当事人约定
-                - 第五百零九条：当事人应当按照约定全面履行自己的义务
-                - 第五百六十三条：当事人一方迟延履行主要债务，经催告后在合理期限内仍未履行
-                """,
-                "category": "civil_law",
-                "tags": ["民法典", "合同", "民事法律"],
-                "source": "法律专家",
-                "version": "1.0",
-                "word_count": 150,
-                "reading_time": 3,
-                "difficulty_level": "intermediate"
-            },
-            {
-                "title": "劳动争议处理实务指南",
-                "content": """
-                劳动争议处理是劳动法律实务中的重要内容，需要按照法定程序进行。
-                
-                处理程序：
-                1. 协商解决：双方协商解决争议
-                2. 调解程序：申请劳动争议调解
-                3. 仲裁程序：申请劳动争议仲裁
-                4. 诉讼程序：不服仲裁裁决可起诉
-                
-                注意事项：
-                - 注意时效期间
-                - 准备相关证据
-                - 选择合适的解决方式
-                """,
-                "category": "labor_law",
-                "tags": ["劳动争议", "处理程序", "劳动法"],
-                "source": "劳动法律师",
-                "version": "1.0",
-                "word_count": 120,
-                "reading_time": 2,
-                "difficulty_level": "beginner"
-            },
-            {
-                "title": "知识产权保护要点",
-                "content": """
-                知识产权保护是法律实务中的重要内容，涉及专利、商标、著作权等方面。
-                
-                保护范围：
-                1. 专利权：发明、实用新型、外观设计
-                2. 商标权：商品商标、服务商标
-                3. 著作权：文学、艺术、科学作品
-                
-                保护措施：
-                - 及时申请注册
-                - 建立保护机制
-                - 维护合法权益
-                """,
-                "category": "intellectual_property",
-                "tags": ["知识产权", "专利", "商标", "著作权"],
-                "source": "知识产权律师",
-                "version": "1.0",
-                "word_count": 100,
-                "reading_time": 2,
-                "difficulty_level": "intermediate"
-            }
-        ]
+        demo_knowledge = []
+        for item in load_seed("demo_knowledge"):
+            # 去掉正文的缩进空白，减小文档和文本索引体积
+            content = textwrap.dedent(item["content"]).strip()
+            reading_time, difficulty_level = _KB_READING_INFO.get(item["title"], (1, "beginner"))
+            demo_knowledge.append({
+                **item,
+                "content": content,
+                "word_count": len(content),
+                "reading_time": reading_time,
+                "difficulty_level": difficulty_level
+            })
         
-        for knowledge_data in demo_knowledge:
-            # 检查知识条目是否已存在
-            existing = KnowledgeBase.objects(title=knowledge_data["title"]).first()
-            if existing:
-                print(f"知识条目 {knowledge_data['title']} 已存在")
-                continue
-            
-            # 创建知识条目
-            knowledge_item = KnowledgeBase(**knowledge_data)
-            knowledge_item.save()
-            print(f"✅ 知识条目 {knowledge_data['title']} 创建成功")
+        created, existed = await upsert_missing(seed_collection(db.knowledge_base), KnowledgeBase, "title", demo_knowledge)
+        print_seed_summary("知识条目", created, existed)
         
         print("✅ 演示知识库数据创建完成")
         
     except Exception as e:
         print(f"❌ 创建演示知识库数据失败: {e}")
 
-async def create_demo_partners():
+async def create_demo_partners(db):
     """创建演示生态合作伙伴"""
     try:
         demo_partners = [
@@ -234,24 +262,15 @@ async def create_demo_partners():
             }
         ]
         
-        for partner_data in demo_partners:
-            # 检查合作伙伴是否已存在
-            existing = EcosystemPartner.objects(name=partner_data["name"]).first()
-            if existing:
-                print(f"合作伙伴 {partner_data['name']} 已存在")
-                continue
-            
-            # 创建合作伙伴
-            partner = EcosystemPartner(**partner_data)
-            partner.save()
-            print(f"✅ 合作伙伴 {partner_data['name']} 创建成功")
+        created, existed = await upsert_missing(seed_collection(db.ecosystem_partners), EcosystemPartner, "name", demo_partners)
+        print_seed_summary("合作伙伴", created, existed)
         
         print("✅ 演示生态合作伙伴创建完成")
         
     except Exception as e:
         print(f"❌ 创建演示生态合作伙伴失败: {e}")
 
-async def create_demo_smart_contracts():
+async def create_demo_smart_contracts(db):
     """创建演示智能合约"""
     try:
         demo_contracts = [
@@ -283,90 +302,39 @@ async def create_demo_smart_contracts():
             }
         ]
         
-        for contract_data in demo_contracts:
-            # 检查智能合约是否已存在
-            existing = SmartContract.objects(contract_id=contract_data["contract_id"]).first()
-            if existing:
-                print(f"智能合约 {contract_data['contract_id']} 已存在")
-                continue
-            
-            # 创建智能合约
-            contract = SmartContract(**contract_data)
-            contract.save()
-            print(f"✅ 智能合约 {contract_data['contract_id']} 创建成功")
+        created, existed = await upsert_missing(seed_collection(db.smart_contracts), SmartContract, "contract_id", demo_contracts)
+        print_seed_summary("智能合约", created, existed)
         
         print("✅ 演示智能合约创建完成")
         
     except Exception as e:
         print(f"❌ 创建演示智能合约失败: {e}")
 
-async def create_indexes():
-    """创建数据库索引"""
-    try:
-        print("创建数据库索引...")
-        
-        # 为知识库创建文本搜索索引
-        KnowledgeBase.objects()._collection.create_index([
-            ("title", "text"),
-            ("content", "text"),
-            ("tags", "text")
-        ])
-        
-        # 为用户创建索引
-        User.objects()._collection.create_index("username")
-        User.objects()._collection.create_index("email")
-        
-        # 为咨询记录创建索引
-        LegalConsultation.objects()._collection.create_index([
-            ("user_id", 1),
-            ("created_at", -1)
-        ])
-        
-        # 为生态合作伙伴创建索引
-        EcosystemPartner.objects()._collection.create_index([
-            ("type", 1),
-            ("region", 1),
-            ("status", 1)
-        ])
-        
-        print("✅ 数据库索引创建完成")
-        
-    except Exception as e:
-        print(f"❌ 创建数据库索引失败: {e}")
-
 async def main():
-    """主函数"""
+    """主函数，返回是否成功"""
     print("MongoDB数据库初始化")
     print("=" * 50)
     
     try:
         # 1. 初始化MongoDB连接
-        print("1. 初始化MongoDB连接...")
+        print("1. 初始化MongoDB连接并创建索引...")
         await init_mongodb()
         
-        # 2. 创建管理员用户
-        print("\n2. 创建管理员用户...")
-        await create_admin_user()
+        db = get_mongodb()
         
-        # 3. 创建演示用户
-        print("\n3. 创建演示用户...")
-        await create_demo_users()
+        # 并发ping预热连接池，让后续并发写入直接使用已建立的连接
+        await asyncio.gather(*(db.command("ping") for _ in range(settings.MONGODB_MIN_POOL_SIZE)))
         
-        # 4. 创建演示知识库数据
-        print("\n4. 创建演示知识库数据...")
-        await create_demo_knowledge()
-        
-        # 5. 创建演示生态合作伙伴
-        print("\n5. 创建演示生态合作伙伴...")
-        await create_demo_partners()
-        
-        # 6. 创建演示智能合约
-        print("\n6. 创建演示智能合约...")
-        await create_demo_smart_contracts()
-        
-        # 7. 创建索引
-        print("\n7. 创建数据库索引...")
-        await create_indexes()
+        # 2-6. 索引已由 init_mongodb 创建，唯一索引在并发写入时即可拦截重复数据；
+        # 管理员、演示用户、知识库、合作伙伴、智能合约互不依赖，并发写入
+        print("\n2-6. 创建管理员用户和演示数据...")
+        await asyncio.gather(
+            create_admin_user(db),
+            create_demo_users(db),
+            create_demo_knowledge(db),
+            create_demo_partners(db),
+            create_demo_smart_contracts(db)
+        )
         
         print("\nMongoDB数据库初始化完成!")
         print("\n📋 系统访问信息:")
@@ -384,9 +352,11 @@ async def main():
         print("  数据库类型: MongoDB")
         print("  连接URL: mongodb://localhost:27017")
         print("  数据库名: law_ai_db")
+        return True
         
     except Exception as e:
         print(f"❌ 数据库初始化失败: {e}")
+        return False
     finally:
         await close_mongodb()
 
@@ -6,28 +6,42 @@
 import os
 import sys
 import asyncio
-import subprocess
+import shlex
 import logging
 from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from scripts.launcher_utils import requirements_digest, requirements_installed, mark_requirements_installed
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 async def run_command(command, description):
-    """运行命令"""
+    """运行命令，逐行输出子进程日志
+    
+    command不经过shell执行，按shlex规则拆分参数，不能包含管道、重定向等shell语法
+    """
     logger.info(f"🚀 {description}...")
+    env = dict(os.environ, PIP_DISABLE_PIP_VERSION_CHECK="1")
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        logger.info(f"✅ {description}完成")
-        return True
-    except subprocess.CalledProcessError as e:
+        process = await asyncio.create_subprocess_exec(
+            *shlex.split(command), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, env=env
+        )
+        async for line in process.stdout:
+            logger.info(line.decode(errors="replace").rstrip())
+        returncode = await process.wait()
+    except OSError as e:
         logger.error(f"❌ {description}失败: {e}")
-        logger.error(f"错误输出: {e.stderr}")
         return False
+    
+    if returncode != 0:
+        logger.error(f"❌ {description}失败: 退出码 {returncode}")
+        return False
+    logger.info(f"✅ {description}完成")
+    return True
 
 async def main():
     """主函数"""
@@ -46,10 +60,18 @@ async def main():
         
         # 2. 安装依赖
         logger.info("\n2. 安装依赖...")
-        success = await run_command("pip install -r requirements.txt", "安装Python依赖")
-        if not success:
-            logger.error("依赖安装失败，请手动安装")
-            return
+        digest = requirements_digest()
+        if requirements_installed(digest):
+            logger.info("✅ requirements.txt 未变化，跳过依赖安装")
+        else:
+            success = await run_command(
+                f'"{sys.executable}" -m pip install --prefer-binary --no-input -r requirements.txt',
+                "安装Python依赖"
+            )
+            if not success:
+                logger.error("依赖安装失败，请手动安装")
+                return
+            mark_requirements_installed(digest)
         
         # 3. 收集数据
         logger.info("\n3. 收集粤港澳大湾区法律数据...")
@@ -75,13 +97,16 @@ async def main():
         logger.info("📚 数据保存在: ./data/disc_law_data")
         
         # 6. 显示使用说明
-        logger.info("\n📖 使用说明:")
-        logger.info("1. 模型文件位置: ./models/disc_law_bert")
-        logger.info("2. 训练数据位置: ./data/disc_law_data")
-        logger.info("3. 使用示例:")
-        logger.info("   from backend.app.services.disc_law_bert import DISCLawBERT")
-        logger.info("   model = DISCLawBERT.load_model('./models/disc_law_bert')")
-        logger.info("   results = model.predict(['根据合同法规定...'])")
+        logger.info("\n".join([
+            "",
+            "📖 使用说明:",
+            "1. 模型文件位置: ./models/disc_law_bert",
+            "2. 训练数据位置: ./data/disc_law_data",
+            "3. 使用示例:",
+            "   from backend.app.services.disc_law_bert import DISCLawBERT",
+            "   model = DISCLawBERT.load_model('./models/disc_law_bert')",
+            "   results = model.predict(['根据合同法规定...'])"
+        ]))
         
     except Exception as e:
         logger.error(f"训练流程失败: {e}")
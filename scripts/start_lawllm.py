@@ -5,24 +5,41 @@
 import os
 import sys
 import subprocess
+import shlex
 import logging
 from datetime import datetime
 
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.launcher_utils import requirements_digest, requirements_installed, mark_requirements_installed
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def run_command(command, description):
-    """运行命令"""
+    """运行命令，逐行输出子进程日志
+    
+    command不经过shell执行，按shlex规则拆分参数，不能包含管道、重定向等shell语法
+    """
     logger.info(f"🚀 {description}...")
+    env = dict(os.environ, PIP_DISABLE_PIP_VERSION_CHECK="1")
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        logger.info(f"✅ {description}完成")
-        return True
-    except subprocess.CalledProcessError as e:
+        with subprocess.Popen(shlex.split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, bufsize=1, env=env) as process:
+            for line in process.stdout:
+                logger.info(line.rstrip())
+            returncode = process.wait()
+    except OSError as e:
         logger.error(f"❌ {description}失败: {e}")
-        logger.error(f"错误输出: {e.stderr}")
         return False
+    
+    if returncode != 0:
+        logger.error(f"❌ {description}失败: 退出码 {returncode}")
+        return False
+    logger.info(f"✅ {description}完成")
+    return True
 
 def main():
     """主函数"""
@@ -41,10 +58,18 @@ def main():
         
         # 2. 安装依赖
         logger.info("\n2. 安装 LawLLM-7B 依赖...")
-        success = run_command("pip install -r requirements.txt", "安装Python依赖")
-        if not success:
-            logger.error("依赖安装失败，请手动安装")
-            return
+        digest = requirements_digest()
+        if requirements_installed(digest):
+            logger.info("✅ requirements.txt 未变化，跳过依赖安装")
+        else:
+            success = run_command(
+                f'"{sys.executable}" -m pip install --prefer-binary --no-input -r requirements.txt',
+                "安装Python依赖"
+            )
+            if not success:
+                logger.error("依赖安装失败，请手动安装")
+                return
+            mark_requirements_installed(digest)
         
         # 3. 检查 vLLM 安装
         logger.info("\n3. 检查 vLLM 安装...")
@@ -82,17 +107,20 @@ def main():
         
         logger.info("\n🎉 LawLLM-7B 服务启动完成!")
         logger.info(f"⏱️ 总耗时: {total_time:.2f} 秒")
-        logger.info("\n📖 使用说明:")
-        logger.info("1. 后端API: http://localhost:8000")
-        logger.info("2. API文档: http://localhost:8000/docs")
-        logger.info("3. 法律咨询接口: POST /api/legal-ai/consult")
-        logger.info("4. 法律分析接口: POST /api/legal-ai/analyze")
-        logger.info("5. 模型状态接口: GET /api/legal-ai/model-status")
-        
-        logger.info("\n🔧 测试命令:")
-        logger.info("curl -X POST http://localhost:8000/api/legal-ai/consult \\")
-        logger.info("  -H 'Content-Type: application/json' \\")
-        logger.info("  -d '{\"question\": \"生产销售假冒伪劣商品罪如何判刑？\"}'")
+        logger.info("\n".join([
+            "",
+            "📖 使用说明:",
+            "1. 后端API: http://localhost:8000",
+            "2. API文档: http://localhost:8000/docs",
+            "3. 法律咨询接口: POST /api/legal-ai/consult",
+            "4. 法律分析接口: POST /api/legal-ai/analyze",
+            "5. 模型状态接口: GET /api/legal-ai/model-status",
+            "",
+            "🔧 测试命令:",
+            "curl -X POST http://localhost:8000/api/legal-ai/consult \\",
+            "  -H 'Content-Type: application/json' \\",
+            "  -d '{\"question\": \"生产销售假冒伪劣商品罪如何判刑？\"}'"
+        ]))
         
     except Exception as e:
         logger.error(f"启动失败: {e}")
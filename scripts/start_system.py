@@ -5,27 +5,39 @@
 """
 import os
 import sys
+import asyncio
 import subprocess
 import time
 import signal
 import threading
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.launcher_utils import (
+    pip_install_command, uvicorn_command,
+    requirements_digest, requirements_installed, mark_requirements_installed,
+)
 
 def check_requirements():
     """检查系统要求"""
     print("检查系统要求...")
     
     # 检查Python版本
-    if sys.version_info < (3, 8):
-        print("❌ Python版本过低，需要Python 3.8+")
+    if sys.version_info < (3, 9):
+        print("❌ Python版本过低，需要Python 3.9+")
         return False
     
     print(f"✅ Python版本: {sys.version}")
     
     # 检查必要的目录
     required_dirs = ["backend", "frontend", "scripts"]
+    # 一次扫描当前目录，之后的检查都在内存中完成
+    with os.scandir(".") as it:
+        existing_dirs = {entry.name for entry in it if entry.is_dir()}
     for dir_name in required_dirs:
-        if not Path(dir_name).exists():
+        if dir_name not in existing_dirs:
             print(f"❌ 缺少目录: {dir_name}")
             return False
         print(f"✅ 目录存在: {dir_name}")
@@ -36,10 +48,15 @@ def install_backend_dependencies():
     """安装后端依赖"""
     print("\n安装后端依赖...")
     try:
-        os.chdir("backend")
-        result = subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
+        digest = requirements_digest()
+        if requirements_installed(digest):
+            print("✅ 后端依赖未变化，跳过安装")
+            return True
+        
+        result = subprocess.run(pip_install_command() + ["-r", "requirements.txt"], 
                               capture_output=True, text=True)
         if result.returncode == 0:
+            mark_requirements_installed(digest)
             print("✅ 后端依赖安装成功")
             return True
         else:
@@ -48,15 +65,12 @@ def install_backend_dependencies():
     except Exception as e:
         print(f"❌ 后端依赖安装失败: {e}")
         return False
-    finally:
-        os.chdir("..")
 
 def install_frontend_dependencies():
     """安装前端依赖"""
     print("\n安装前端依赖...")
     try:
-        os.chdir("frontend")
-        result = subprocess.run(["npm", "install"], capture_output=True, text=True)
+        result = subprocess.run(["npm", "install"], cwd="frontend", capture_output=True, text=True)
         if result.returncode == 0:
             print("✅ 前端依赖安装成功")
             return True
@@ -66,21 +80,25 @@ def install_frontend_dependencies():
     except Exception as e:
         print(f"❌ 前端依赖安装失败: {e}")
         return False
-    finally:
-        os.chdir("..")
+
+def run_script(script):
+    """运行脚本，子进程输出直接显示，返回是否成功"""
+    with subprocess.Popen([sys.executable, script], stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, bufsize=1) as process:
+        for line in process.stdout:
+            print(f"  {line.rstrip()}")
+        return process.wait() == 0
 
 def setup_database():
     """设置数据库"""
     print("\n设置数据库...")
     try:
         # 运行数据库初始化脚本
-        result = subprocess.run([sys.executable, "scripts/setup_database.py"], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
+        if run_script("scripts/setup_database.py"):
             print("✅ 数据库设置成功")
             return True
         else:
-            print(f"❌ 数据库设置失败: {result.stderr}")
+            print("❌ 数据库设置失败")
             return False
     except Exception as e:
         print(f"❌ 数据库设置失败: {e}")
@@ -90,122 +108,122 @@ def start_backend():
     """启动后端服务"""
     print("\n启动后端服务...")
     try:
-        os.chdir("backend")
-        process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", 
-            "main:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000", 
-            "--reload"
-        ])
+        process = subprocess.Popen(uvicorn_command(), cwd="backend")
         print("✅ 后端服务启动成功 (PID: {})".format(process.pid))
         return process
     except Exception as e:
         print(f"❌ 后端服务启动失败: {e}")
         return None
-    finally:
-        os.chdir("..")
 
 def start_frontend():
     """启动前端服务"""
     print("\n启动前端服务...")
     try:
-        os.chdir("frontend")
-        process = subprocess.Popen(["npm", "start"])
+        process = subprocess.Popen(["npm", "start"], cwd="frontend")
         print("✅ 前端服务启动成功 (PID: {})".format(process.pid))
         return process
     except Exception as e:
         print(f"❌ 前端服务启动失败: {e}")
         return None
-    finally:
-        os.chdir("..")
 
 def collect_data():
     """采集数据"""
     print("\n开始数据采集...")
     try:
-        result = subprocess.run([sys.executable, "scripts/data_collection.py"], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
+        if run_script("scripts/data_collection.py"):
             print("✅ 数据采集完成")
             return True
         else:
-            print(f"❌ 数据采集失败: {result.stderr}")
+            print("❌ 数据采集失败")
             return False
     except Exception as e:
         print(f"❌ 数据采集失败: {e}")
         return False
 
+async def _probe(session, url):
+    """请求一次服务地址，返回状态码"""
+    async with session.get(url) as response:
+        return response.status
+
+async def _wait_for_services(services, deadline_seconds=30, interval=0.2):
+    """在同一个事件循环中并发轮询全部服务，返回各服务最后一次的状态码或异常"""
+    import aiohttp
+    results = {}
+    pending = dict(services)
+    deadline = time.monotonic() + deadline_seconds
+    timeout = aiohttp.ClientTimeout(total=5)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while pending and time.monotonic() < deadline:
+            probes = await asyncio.gather(
+                *(_probe(session, url) for url in pending.values()),
+                return_exceptions=True
+            )
+            for name, result in zip(list(pending), probes):
+                results[name] = result
+                if result == 200:
+                    del pending[name]
+            if pending:
+                await asyncio.sleep(interval)
+    return results
+
 def wait_for_services():
-    """等待服务启动"""
+    """等待服务启动（后端和前端并发轮询，服务就绪即返回）"""
     print("\n等待服务启动...")
-    time.sleep(5)
     
-    # 检查后端服务
-    try:
-        import requests
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        if response.status_code == 200:
-            print("✅ 后端服务运行正常")
+    services = {
+        "后端服务": "http://localhost:8000/health",
+        "前端服务": "http://localhost:3000"
+    }
+    results = asyncio.run(_wait_for_services(services))
+    for name in services:
+        result = results.get(name)
+        if result == 200:
+            print(f"✅ {name}运行正常")
+        elif isinstance(result, Exception):
+            print(f"❌ {name}检查失败: {result}")
         else:
-            print("❌ 后端服务响应异常")
-    except Exception as e:
-        print(f"❌ 后端服务检查失败: {e}")
-    
-    # 检查前端服务
-    try:
-        response = requests.get("http://localhost:3000", timeout=5)
-        if response.status_code == 200:
-            print("✅ 前端服务运行正常")
-        else:
-            print("❌ 前端服务响应异常")
-    except Exception as e:
-        print(f"❌ 前端服务检查失败: {e}")
+            print(f"❌ {name}响应异常")
 
 def show_system_info():
-    """显示系统信息"""
-    print("\n" + "="*60)
-    print("🎉 AI法律服务生态链系统启动成功!")
-    print("="*60)
-    print("\n📋 系统访问信息:")
-    print("  后端API: http://localhost:8000")
-    print("  前端界面: http://localhost:3000")
-    print("  API文档: http://localhost:8000/docs")
-    print("  管理后台: http://localhost:8000/admin")
-    
-    print("\n👤 默认用户账号:")
-    print("  管理员: admin / admin123")
-    print("  律师: lawyer1 / lawyer123")
-    print("  企业: enterprise1 / enterprise123")
-    print("  用户: user1 / user123")
-    
-    print("\n🔧 系统功能:")
-    print("  ✅ 智能法律咨询")
-    print("  ✅ 法律知识库管理")
-    print("  ✅ 生态协同管理")
-    print("  ✅ 数据分析仪表盘")
-    print("  ✅ AI模型集成")
-    
-    print("\n📚 技术栈:")
-    print("  后端: FastAPI + Python + PostgreSQL")
-    print("  前端: React + TypeScript + Ant Design")
-    print("  AI模型: DeepSeek R1 + BERT")
-    print("  数据库: PostgreSQL + Redis")
-    
-    print("\n🚀 下一步操作:")
-    print("  1. 访问 http://localhost:3000 开始使用")
-    print("  2. 使用默认账号登录系统")
-    print("  3. 体验智能法律咨询功能")
-    print("  4. 管理法律知识库")
-    print("  5. 配置生态合作伙伴")
-    
-    print("\n⚠️  注意事项:")
-    print("  - 请确保数据库服务正在运行")
-    print("  - 请确保Redis服务正在运行")
-    print("  - 如需配置AI模型，请编辑 .env 文件")
-    print("  - 按 Ctrl+C 停止所有服务")
-    
-    print("\n" + "="*60)
+    """显示系统信息（整段一次输出）"""
+    print("\n".join([
+        "\n" + "="*60,
+        "🎉 AI法律服务生态链系统启动成功!",
+        "="*60,
+        "\n📋 系统访问信息:",
+        "  后端API: http://localhost:8000",
+        "  前端界面: http://localhost:3000",
+        "  API文档: http://localhost:8000/docs",
+        "  管理后台: http://localhost:8000/admin",
+        "\n👤 默认用户账号:",
+        "  管理员: admin / admin123",
+        "  律师: lawyer1 / lawyer123",
+        "  企业: enterprise1 / enterprise123",
+        "  用户: user1 / user123",
+        "\n🔧 系统功能:",
+        "  ✅ 智能法律咨询",
+        "  ✅ 法律知识库管理",
+        "  ✅ 生态协同管理",
+        "  ✅ 数据分析仪表盘",
+        "  ✅ AI模型集成",
+        "\n📚 技术栈:",
+        "  后端: FastAPI + Python + PostgreSQL",
+        "  前端: React + TypeScript + Ant Design",
+        "  AI模型: DeepSeek R1 + BERT",
+        "  数据库: PostgreSQL + Redis",
+        "\n🚀 下一步操作:",
+        "  1. 访问 http://localhost:3000 开始使用",
+        "  2. 使用默认账号登录系统",
+        "  3. 体验智能法律咨询功能",
+        "  4. 管理法律知识库",
+        "  5. 配置生态合作伙伴",
+        "\n⚠️  注意事项:",
+        "  - 请确保数据库服务正在运行",
+        "  - 请确保Redis服务正在运行",
+        "  - 如需配置AI模型，请编辑 .env 文件",
+        "  - 按 Ctrl+C 停止所有服务",
+        "\n" + "="*60
+    ]))
 
 def signal_handler(sig, frame):
     """信号处理器"""
@@ -227,13 +245,16 @@ def main():
             print("❌ 系统要求检查失败，请解决上述问题后重试")
             return
         
-        # 2. 安装后端依赖
-        if not install_backend_dependencies():
+        # 2-3. 并发安装后端和前端依赖（两者都以网络下载为主，互不依赖）
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            backend_install = executor.submit(install_backend_dependencies)
+            frontend_install = executor.submit(install_frontend_dependencies)
+        
+        if not backend_install.result():
             print("❌ 后端依赖安装失败，请检查网络连接和Python环境")
             return
         
-        # 3. 安装前端依赖
-        if not install_frontend_dependencies():
+        if not frontend_install.result():
             print("❌ 前端依赖安装失败，请检查Node.js环境")
             return
         
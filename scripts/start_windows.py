@@ -5,27 +5,45 @@ Windows系统启动脚本
 """
 import os
 import sys
+import asyncio
 import subprocess
-import time
 import signal
+import socket
+import hashlib
+import importlib
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse
+
+# 添加项目根目录到Python路径，以便在当前进程中导入 scripts 下的初始化脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.launcher_utils import (
+    pip_install_command, uvicorn_command,
+    requirements_digest, requirements_installed, mark_requirements_installed,
+)
+
+MONGODB_URL = os.environ.get("MONGODB_URL", "mongodb://localhost:27017")
 
 def check_requirements():
     """检查系统要求"""
     print("检查系统要求...")
     
     # 检查Python版本
-    if sys.version_info < (3, 8):
-        print("❌ Python版本过低，需要Python 3.8+")
+    if sys.version_info < (3, 9):
+        print("❌ Python版本过低，需要Python 3.9+")
         return False
     
     print(f"✅ Python版本: {sys.version}")
     
     # 检查必要的目录
     required_dirs = ["backend", "frontend", "scripts"]
+    # 一次扫描当前目录，之后的检查都在内存中完成
+    with os.scandir(".") as it:
+        existing_dirs = {entry.name for entry in it if entry.is_dir()}
     for dir_name in required_dirs:
-        if not Path(dir_name).exists():
+        if dir_name not in existing_dirs:
             print(f"❌ 缺少目录: {dir_name}")
             return False
         print(f"✅ 目录存在: {dir_name}")
@@ -36,11 +54,21 @@ def check_mongodb():
     """检查MongoDB是否运行"""
     print("检查MongoDB服务...")
     try:
-        result = subprocess.run(["mongo", "--eval", "db.runCommand('ping')"], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
+        # 直接用pymongo发送ping命令，不启动mongo shell进程
+        from pymongo import MongoClient
+        with MongoClient(MONGODB_URL, serverSelectionTimeoutMS=1500) as client:
+            client.admin.command("ping")
+        print("✅ MongoDB服务运行正常")
+        return True
+    except ImportError:
+        # 首次启动时后端依赖尚未安装，退回到检查端口是否监听
+        parsed = urlparse(MONGODB_URL)
+        try:
+            socket.create_connection((parsed.hostname, parsed.port or 27017), timeout=1.5).close()
             print("✅ MongoDB服务运行正常")
             return True
+        except OSError:
+            pass
     except Exception:
         pass
     
@@ -48,190 +76,282 @@ def check_mongodb():
     print("请先运行: python scripts/install_mongodb.py")
     return False
 
+def run_streaming(command, label, cwd=None):
+    """运行命令，子进程输出逐行显示（带标签前缀，便于区分并发任务），返回是否成功"""
+    with subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, bufsize=1) as process:
+        for line in process.stdout:
+            print(f"  [{label}] {line.rstrip()}")
+        return process.wait() == 0
+
+# 前端依赖安装哨兵文件目录：记录上次成功安装时锁文件的摘要，未变化时跳过安装
+# （后端依赖与其他启动脚本共用 launcher_utils 中的摘要记录）
+STARTUP_CACHE_DIR = Path(".startup_cache")
+
+def lockfile_digest(path, *extra):
+    """锁文件内容（及附加标识）的摘要"""
+    digest = hashlib.sha256(Path(path).read_bytes())
+    for item in extra:
+        digest.update(item.encode())
+    return digest.hexdigest()
+
+def is_up_to_date(digest, sentinel):
+    """哨兵文件中的摘要与当前一致"""
+    sentinel = STARTUP_CACHE_DIR / sentinel
+    return sentinel.exists() and sentinel.read_text().strip() == digest
+
+def mark_up_to_date(digest, sentinel):
+    """安装成功后写入哨兵文件"""
+    STARTUP_CACHE_DIR.mkdir(exist_ok=True)
+    (STARTUP_CACHE_DIR / sentinel).write_text(digest)
+
 def install_backend_dependencies():
     """安装后端依赖"""
     print("\n安装后端依赖...")
     try:
-        os.chdir("backend")
-        result = subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
+        digest = requirements_digest()
+        if requirements_installed(digest):
+            print("✅ 后端依赖未变化，跳过安装")
+            return True
+        
+        if run_streaming(pip_install_command() + ["-r", "requirements.txt"], "backend"):
+            mark_requirements_installed(digest)
             print("✅ 后端依赖安装成功")
             return True
         else:
-            print(f"❌ 后端依赖安装失败: {result.stderr}")
+            print("❌ 后端依赖安装失败")
             return False
     except Exception as e:
         print(f"❌ 后端依赖安装失败: {e}")
         return False
-    finally:
-        os.chdir("..")
 
 def install_frontend_dependencies():
     """安装前端依赖"""
     print("\n安装前端依赖...")
     try:
-        os.chdir("frontend")
-        result = subprocess.run(["npm", "install"], capture_output=True, text=True)
-        if result.returncode == 0:
+        # 有package-lock.json时使用npm ci（按锁文件精确安装），否则退回npm install
+        lockfile = Path("frontend/package-lock.json")
+        has_lockfile = lockfile.exists()
+        digest = lockfile_digest(lockfile if has_lockfile else "frontend/package.json")
+        if Path("frontend/node_modules").exists() and is_up_to_date(digest, "frontend.sha"):
+            print("✅ 前端依赖未变化，跳过安装")
+            return True
+        
+        command = ["npm", "ci"] if has_lockfile else ["npm", "install"]
+        if run_streaming(command, "frontend", cwd="frontend"):
+            mark_up_to_date(digest, "frontend.sha")
             print("✅ 前端依赖安装成功")
             return True
         else:
-            print(f"❌ 前端依赖安装失败: {result.stderr}")
+            print("❌ 前端依赖安装失败")
             return False
     except Exception as e:
         print(f"❌ 前端依赖安装失败: {e}")
         return False
-    finally:
-        os.chdir("..")
 
 def setup_mongodb_database():
     """设置MongoDB数据库"""
     print("\n设置MongoDB数据库...")
     try:
-        result = subprocess.run([sys.executable, "scripts/setup_mongodb_database.py"], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
+        # 在当前进程中导入并运行，省去再启动一个解释器的开销；依赖在此前一步才安装，因此延迟导入
+        setup_module = importlib.import_module("scripts.setup_mongodb_database")
+        if asyncio.run(setup_module.main()):
             print("✅ MongoDB数据库设置成功")
             return True
         else:
-            print(f"❌ MongoDB数据库设置失败: {result.stderr}")
+            print("❌ MongoDB数据库设置失败")
             return False
     except Exception as e:
         print(f"❌ MongoDB数据库设置失败: {e}")
         return False
 
 def collect_data():
-    """采集数据"""
-    print("\n开始数据采集...")
+    """在后台子进程中采集数据，不阻塞后续启动步骤，也不在退出时等待；结束时报告结果"""
+    print("\n开始数据采集（后台运行）...")
     try:
-        result = subprocess.run([sys.executable, "scripts/data_collection.py"], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
-            print("✅ 数据采集完成")
-            return True
-        else:
-            print(f"❌ 数据采集失败: {result.stderr}")
-            return False
+        process = subprocess.Popen([sys.executable, "scripts/data_collection.py"])
     except Exception as e:
         print(f"❌ 数据采集失败: {e}")
-        return False
+        return None
+    
+    def report():
+        if process.wait() == 0:
+            print("✅ 数据采集完成")
+        else:
+            print("⚠️  数据采集失败，知识库数据可能不完整")
+    
+    threading.Thread(target=report, daemon=True).start()
+    return process
 
-def start_backend():
-    """启动后端服务"""
-    print("\n启动后端服务...")
+async def launch(name, argv, cwd):
+    """以异步子进程方式启动服务，失败时返回None"""
     try:
-        os.chdir("backend")
-        process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", 
-            "main:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000", 
-            "--reload"
-        ])
-        print("✅ 后端服务启动成功 (PID: {})".format(process.pid))
+        process = await asyncio.create_subprocess_exec(*argv, cwd=cwd)
+        print(f"✅ {name}启动成功 (PID: {process.pid})")
         return process
     except Exception as e:
-        print(f"❌ 后端服务启动失败: {e}")
+        print(f"❌ {name}启动失败: {e}")
         return None
-    finally:
-        os.chdir("..")
+
+def start_backend():
+    """启动后端服务"""
+    return launch("后端服务", uvicorn_command(), "backend")
 
 def start_frontend():
     """启动前端服务"""
-    print("\n启动前端服务...")
-    try:
-        os.chdir("frontend")
-        process = subprocess.Popen(["npm", "start"])
-        print("✅ 前端服务启动成功 (PID: {})".format(process.pid))
-        return process
-    except Exception as e:
-        print(f"❌ 前端服务启动失败: {e}")
-        return None
-    finally:
-        os.chdir("..")
+    return launch("前端服务", ["npm", "start"], "frontend")
 
-def wait_for_services():
-    """等待服务启动"""
+async def wait_port(host, port, deadline, initial_delay=0.05, max_delay=1.0):
+    """指数退避尝试TCP连接，端口开始监听即返回True；超过截止时间返回False"""
+    loop = asyncio.get_running_loop()
+    delay = initial_delay
+    while loop.time() < deadline:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=0.2)
+            writer.close()
+            return True
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_delay)
+    return False
+
+async def wait_one(session, url, deadline, initial_delay=0.05, max_delay=1.0):
+    """先等待端口监听，再指数退避轮询服务地址，直到返回200或超过截止时间；返回最后一次的状态码或异常"""
+    loop = asyncio.get_running_loop()
+    parsed = urlparse(url)
+    # TCP连接远比完整的HTTP请求便宜，端口未监听前不发送HTTP请求
+    if not await wait_port(parsed.hostname, parsed.port, deadline, initial_delay, max_delay):
+        return ConnectionError(f"端口 {parsed.port} 未监听")
+    delay = initial_delay
+    result = None
+    while loop.time() < deadline:
+        try:
+            async with session.get(url) as response:
+                result = response.status
+            if result == 200:
+                return result
+        except Exception as e:
+            result = e
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_delay)
+    return result
+
+async def wait_for_services(timeout=60):
+    """等待服务启动（后端和前端并发轮询，服务就绪即返回）"""
     print("\n等待服务启动...")
-    time.sleep(5)
     
-    # 检查后端服务
-    try:
-        import requests
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        if response.status_code == 200:
-            print("✅ 后端服务运行正常")
+    services = {
+        "后端服务": "http://localhost:8000/health",
+        "前端服务": "http://localhost:3000"
+    }
+    import aiohttp
+    deadline = asyncio.get_running_loop().time() + timeout
+    # 所有探测共用一个连接池，轮询时复用keep-alive连接而不是每次重新握手
+    connector = aiohttp.TCPConnector(limit=16, limit_per_host=8)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=1)) as session:
+        results = await asyncio.gather(
+            *(wait_one(session, url, deadline) for url in services.values())
+        )
+    for name, result in zip(services, results):
+        if result == 200:
+            print(f"✅ {name}运行正常")
+        elif isinstance(result, Exception):
+            print(f"❌ {name}检查失败: {result}")
         else:
-            print("❌ 后端服务响应异常")
-    except Exception as e:
-        print(f"❌ 后端服务检查失败: {e}")
-    
-    # 检查前端服务
-    try:
-        response = requests.get("http://localhost:3000", timeout=5)
-        if response.status_code == 200:
-            print("✅ 前端服务运行正常")
-        else:
-            print("❌ 前端服务响应异常")
-    except Exception as e:
-        print(f"❌ 前端服务检查失败: {e}")
+            print(f"❌ {name}响应异常")
+
+# 启动成功后显示的系统信息，整段预先拼好，一次写出
+SYSTEM_INFO_BANNER = "\n".join([
+    "\n" + "="*60,
+    "🎉 AI法律服务生态链系统启动成功!",
+    "="*60,
+    "\n📋 系统访问信息:",
+    "  后端API: http://localhost:8000",
+    "  前端界面: http://localhost:3000",
+    "  API文档: http://localhost:8000/docs",
+    "  管理后台: http://localhost:8000/admin",
+    "\n👤 默认用户账号:",
+    "  管理员: admin / admin123",
+    "  律师: lawyer1 / lawyer123",
+    "  企业: enterprise1 / enterprise123",
+    "  用户: user1 / user123",
+    "\n🗄️ 数据库信息:",
+    "  数据库类型: MongoDB",
+    "  连接URL: mongodb://localhost:27017",
+    "  数据库名: law_ai_db",
+    "\n🔧 系统功能:",
+    "  ✅ 智能法律咨询 (DeepSeek R1 + BERT)",
+    "  ✅ 法律知识库管理 (MongoDB)",
+    "  ✅ 生态协同管理",
+    "  ✅ 数据分析仪表盘",
+    "  ✅ 智能合约部署",
+    "\n📚 技术栈:",
+    "  后端: FastAPI + Python + MongoDB",
+    "  前端: React + TypeScript + Ant Design",
+    "  AI模型: DeepSeek R1 + BERT",
+    "  数据库: MongoDB + Redis",
+    "\n🚀 下一步操作:",
+    "  1. 访问 http://localhost:3000 开始使用",
+    "  2. 使用默认账号登录系统",
+    "  3. 体验智能法律咨询功能",
+    "  4. 管理法律知识库",
+    "  5. 配置生态合作伙伴",
+    "\n⚠️  注意事项:",
+    "  - 请确保MongoDB服务正在运行",
+    "  - 请确保Redis服务正在运行",
+    "  - 如需配置AI模型，请编辑 .env 文件",
+    "  - 按 Ctrl+C 停止所有服务",
+    "\n" + "="*60,
+]) + "\n"
 
 def show_system_info():
-    """显示系统信息"""
-    print("\n" + "="*60)
-    print("🎉 AI法律服务生态链系统启动成功!")
-    print("="*60)
-    print("\n📋 系统访问信息:")
-    print("  后端API: http://localhost:8000")
-    print("  前端界面: http://localhost:3000")
-    print("  API文档: http://localhost:8000/docs")
-    print("  管理后台: http://localhost:8000/admin")
-    
-    print("\n👤 默认用户账号:")
-    print("  管理员: admin / admin123")
-    print("  律师: lawyer1 / lawyer123")
-    print("  企业: enterprise1 / enterprise123")
-    print("  用户: user1 / user123")
-    
-    print("\n🗄️ 数据库信息:")
-    print("  数据库类型: MongoDB")
-    print("  连接URL: mongodb://localhost:27017")
-    print("  数据库名: law_ai_db")
-    
-    print("\n🔧 系统功能:")
-    print("  ✅ 智能法律咨询 (DeepSeek R1 + BERT)")
-    print("  ✅ 法律知识库管理 (MongoDB)")
-    print("  ✅ 生态协同管理")
-    print("  ✅ 数据分析仪表盘")
-    print("  ✅ 智能合约部署")
-    
-    print("\n📚 技术栈:")
-    print("  后端: FastAPI + Python + MongoDB")
-    print("  前端: React + TypeScript + Ant Design")
-    print("  AI模型: DeepSeek R1 + BERT")
-    print("  数据库: MongoDB + Redis")
-    
-    print("\n🚀 下一步操作:")
-    print("  1. 访问 http://localhost:3000 开始使用")
-    print("  2. 使用默认账号登录系统")
-    print("  3. 体验智能法律咨询功能")
-    print("  4. 管理法律知识库")
-    print("  5. 配置生态合作伙伴")
-    
-    print("\n⚠️  注意事项:")
-    print("  - 请确保MongoDB服务正在运行")
-    print("  - 请确保Redis服务正在运行")
-    print("  - 如需配置AI模型，请编辑 .env 文件")
-    print("  - 按 Ctrl+C 停止所有服务")
-    
-    print("\n" + "="*60)
+    """显示系统信息（整段一次写出，避免与子进程输出交错）"""
+    sys.stdout.write(SYSTEM_INFO_BANNER)
+    sys.stdout.flush()
 
 def signal_handler(sig, frame):
     """信号处理器"""
     print("\n\n🛑 正在停止系统...")
     sys.exit(0)
 
+async def run_services():
+    """并发启动后端和前端服务并保持运行"""
+    # 7-8. 并发启动后端和前端服务
+    print("\n启动后端和前端服务...")
+    backend_process, frontend_process = await asyncio.gather(start_backend(), start_frontend())
+    if not backend_process or not frontend_process:
+        for process in (backend_process, frontend_process):
+            if process:
+                process.terminate()
+                await process.wait()
+        print("❌ 服务启动失败")
+        return
+    
+    # 9. 等待服务启动
+    await wait_for_services()
+    
+    # 10. 显示系统信息
+    show_system_info()
+    
+    # 11. 保持运行：阻塞等待任一服务进程退出或收到Ctrl+C，不再每秒轮询
+    print("\n⏳ 系统运行中，按 Ctrl+C 停止...")
+    processes = {"后端服务": backend_process, "前端服务": frontend_process}
+    waiters = {asyncio.ensure_future(process.wait()): name for name, process in processes.items()}
+    try:
+        done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in done:
+            print(f"\n❌ {waiters[waiter]}已退出 (返回码: {waiter.result()})")
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    
+    print("\n🛑 正在停止系统...")
+    for process in processes.values():
+        if process.returncode is None:
+            process.terminate()
+    await asyncio.gather(*(process.wait() for process in processes.values()))
+    print("✅ 系统已停止")
+
 def main():
     """主函数"""
     print("🚀 AI法律服务生态链系统启动器 (Windows + MongoDB)")
@@ -242,63 +362,43 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     
     try:
-        # 1. 检查系统要求
-        if not check_requirements():
+        # 1-2. 并发检查系统要求和MongoDB
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            requirements_ok = executor.submit(check_requirements)
+            mongodb_ok = executor.submit(check_mongodb)
+        
+        if not requirements_ok.result():
             print("❌ 系统要求检查失败，请解决上述问题后重试")
             return
         
-        # 2. 检查MongoDB
-        if not check_mongodb():
+        if not mongodb_ok.result():
             print("❌ MongoDB服务检查失败，请先安装和启动MongoDB")
             print("运行: python scripts/install_mongodb.py")
             return
         
-        # 3. 安装后端依赖
-        if not install_backend_dependencies():
+        # 3-4. 并发安装后端和前端依赖
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            backend_install = executor.submit(install_backend_dependencies)
+            frontend_install = executor.submit(install_frontend_dependencies)
+        
+        if not backend_install.result():
             print("❌ 后端依赖安装失败，请检查网络连接和Python环境")
             return
         
-        # 4. 安装前端依赖
-        if not install_frontend_dependencies():
+        if not frontend_install.result():
             print("❌ 前端依赖安装失败，请检查Node.js环境")
             return
         
-        # 5. 设置MongoDB数据库
-        if not setup_mongodb_database():
-            print("❌ MongoDB数据库设置失败，请检查MongoDB连接")
-            return
-        
-        # 6. 采集数据
+        # 5-6. 数据采集写入关系型数据库，与MongoDB初始化和服务启动互不依赖，
+        # 在后台子进程中运行，与MongoDB初始化、服务启动重叠执行
         collect_data()
         
-        # 7. 启动后端服务
-        backend_process = start_backend()
-        if not backend_process:
-            print("❌ 后端服务启动失败")
-            return
-        
-        # 8. 启动前端服务
-        frontend_process = start_frontend()
-        if not frontend_process:
-            print("❌ 前端服务启动失败")
+        if not setup_mongodb_database():
+            print("❌ MongoDB数据库设置失败，请检查MongoDB连接")
             return
         
-        # 9. 等待服务启动
-        wait_for_services()
-        
-        # 10. 显示系统信息
-        show_system_info()
-        
-        # 11. 保持运行
-        print("\n⏳ 系统运行中，按 Ctrl+C 停止...")
-        try:
-            while True:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 正在停止系统...")
-            backend_process.terminate()
-            frontend_process.terminate()
-            print("✅ 系统已停止")
+        # 7-11. 在事件循环中启动并运行服务
+        asyncio.run(run_services())
     
     except Exception as e:
         print(f"❌ 系统启动失败: {e}")
@@ -4,8 +4,10 @@
 """
 import os
 import sys
+import shlex
 import subprocess
 import logging
+from importlib import metadata
 from datetime import datetime
 
 # 设置日志
@@ -13,16 +15,26 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 def run_command(command, description):
-    """运行命令"""
+    """运行命令，逐行输出子进程日志
+    
+    command不经过shell执行，按shlex规则拆分参数，不能包含管道、重定向等shell语法
+    """
     logger.info(f"🚀 {description}...")
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        logger.info(f"✅ {description}完成")
-        return True
-    except subprocess.CalledProcessError as e:
+        with subprocess.Popen(shlex.split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, bufsize=1) as process:
+            for line in process.stdout:
+                logger.info(line.rstrip())
+            returncode = process.wait()
+    except OSError as e:
         logger.error(f"❌ {description}失败: {e}")
-        logger.error(f"错误输出: {e.stderr}")
         return False
+    
+    if returncode != 0:
+        logger.error(f"❌ {description}失败: 退出码 {returncode}")
+        return False
+    logger.info(f"✅ {description}完成")
+    return True
 
 def main():
     """主函数"""
@@ -46,22 +58,19 @@ def main():
             logger.error("依赖安装失败，请手动安装")
             return
         
-        # 3. 检查 transformers 安装
+        # 3. 检查 transformers 安装（只读取包元数据，不导入模块）
         logger.info("\n3. 检查 transformers 安装...")
         try:
-            import transformers
-            logger.info(f"✅ transformers 版本: {transformers.__version__}")
-        except ImportError:
+            logger.info(f"✅ transformers 版本: {metadata.version('transformers')}")
+        except metadata.PackageNotFoundError:
             logger.error("❌ transformers 未安装")
             return
         
-        # 4. 检查 torch 安装
+        # 4. 检查 torch 安装（CUDA 是否可用由模型测试输出的设备信息给出）
         logger.info("\n4. 检查 torch 安装...")
         try:
-            import torch
-            logger.info(f"✅ torch 版本: {torch.__version__}")
-            logger.info(f"✅ CUDA 可用: {torch.cuda.is_available()}")
-        except ImportError:
+            logger.info(f"✅ torch 版本: {metadata.version('torch')}")
+        except metadata.PackageNotFoundError:
             logger.error("❌ torch 未安装")
             return
         
@@ -39,7 +39,7 @@ async def test_lawllm():
         
         for i, question in enumerate(test_questions, 1):
             logger.info(f"\n问题 {i}: {question}")
-            response = service.legal_consultation(question)
+            response = await service.legal_consultation(question)
             logger.info(f"回答: {response['answer'][:200]}...")
             logger.info(f"置信度: {response['confidence']:.2f}")
         
@@ -51,7 +51,7 @@ async def test_lawllm():
         请分析此案例的法律关系和可能的法律后果。
         """
         
-        analysis = service.legal_analysis(case_text)
+        analysis = await service.legal_analysis(case_text)
         logger.info(f"案例分析: {analysis['analysis'][:200]}...")
         logger.info(f"置信度: {analysis['confidence']:.2f}")
         
@@ -62,7 +62,7 @@ async def test_lawllm():
         合同还约定如发生争议，双方应友好协商解决。
         """
         
-        review = service.legal_document_review(document_text)
+        review = await service.legal_document_review(document_text)
         logger.info(f"文档审查: {review['review'][:200]}...")
         logger.info(f"置信度: {review['confidence']:.2f}")
         
@@ -70,7 +70,7 @@ async def test_lawllm():
         logger.info("\n5. 测试法律研究...")
         research_topic = "粤港澳大湾区法律一体化发展研究"
         
-        research = service.legal_research(research_topic)
+        research = await service.legal_research(research_topic)
         logger.info(f"研究报告: {research['research_report'][:200]}...")
         logger.info(f"置信度: {research['confidence']:.2f}")
         
@@ -82,7 +82,7 @@ async def test_lawllm():
             "劳动法保护哪些权益？"
         ]
         
-        batch_results = service.batch_consultation(batch_questions)
+        batch_results = await service.batch_consultation(batch_questions)
         logger.info(f"批量咨询结果: {len(batch_results)} 条")
         for result in batch_results:
             logger.info(f"  - {result['question']}: {result['answer'][:100]}...")
@@ -5,13 +5,12 @@
 import os
 import sys
 import asyncio
+import importlib
 import logging
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.app.services.lawllm_service_windows import LawLLMServiceWindows
-
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -22,8 +21,11 @@ async def test_lawllm_windows():
     logger.info("=" * 60)
     
     try:
-        # 1. 初始化服务
+        # 1. 初始化服务（torch/transformers 导入耗时较长，到此处才导入服务模块）
         logger.info("1. 初始化 LawLLM-7B 服务...")
+        LawLLMServiceWindows = importlib.import_module(
+            "backend.app.services.lawllm_service_windows"
+        ).LawLLMServiceWindows
         service = LawLLMServiceWindows()
         service.initialize()
         
@@ -37,40 +39,37 @@ async def test_lawllm_windows():
             "环境污染的法律责任是什么？"
         ]
         
-        for i, question in enumerate(test_questions, 1):
-            logger.info(f"\n问题 {i}: {question}")
-            response = service.legal_consultation(question)
+        # 全部问题合并为一次批量推理
+        responses = await service.batch_consultation(test_questions)
+        for i, response in enumerate(responses, 1):
+            logger.info(f"\n问题 {i}: {response['question']}")
             logger.info(f"回答: {response['answer'][:200]}...")
             logger.info(f"置信度: {response['confidence']:.2f}")
         
-        # 3. 测试法律分析
-        logger.info("\n3. 测试法律案例分析...")
+        # 3-5. 法律案例分析、文档审查、法律研究合并为一次批量推理
+        logger.info("\n3-5. 测试法律案例分析、文档审查和法律研究...")
         case_text = """
         某公司员工张某在工作期间受伤，公司拒绝支付医疗费用。
         张某要求公司承担工伤责任，但公司认为张某违反安全规定导致受伤。
         请分析此案例的法律关系和可能的法律后果。
         """
         
-        analysis = service.legal_analysis(case_text)
-        logger.info(f"案例分析: {analysis['analysis'][:200]}...")
-        logger.info(f"置信度: {analysis['confidence']:.2f}")
-        
-        # 4. 测试法律文档审查
-        logger.info("\n4. 测试法律文档审查...")
         document_text = """
         本合同约定甲方应向乙方支付服务费用，但未明确支付时间和方式。
         合同还约定如发生争议，双方应友好协商解决。
         """
         
-        review = service.legal_document_review(document_text)
-        logger.info(f"文档审查: {review['review'][:200]}...")
-        logger.info(f"置信度: {review['confidence']:.2f}")
-        
-        # 5. 测试法律研究
-        logger.info("\n5. 测试法律研究...")
         research_topic = "粤港澳大湾区法律一体化发展研究"
         
-        research = service.legal_research(research_topic)
+        analysis, review, research = await service.batch_tasks([
+            ("analysis", case_text),
+            ("review", document_text),
+            ("research", research_topic)
+        ])
+        logger.info(f"案例分析: {analysis['analysis'][:200]}...")
+        logger.info(f"置信度: {analysis['confidence']:.2f}")
+        logger.info(f"文档审查: {review['review'][:200]}...")
+        logger.info(f"置信度: {review['confidence']:.2f}")
         logger.info(f"研究报告: {research['research_report'][:200]}...")
         logger.info(f"置信度: {research['confidence']:.2f}")
         
@@ -82,7 +81,7 @@ async def test_lawllm_windows():
             "劳动法保护哪些权益？"
         ]
         
-        batch_results = service.batch_consultation(batch_questions)
+        batch_results = await service.batch_consultation(batch_questions)
         logger.info(f"批量咨询结果: {len(batch_results)} 条")
         for result in batch_results:
             logger.info(f"  - {result['question']}: {result['answer'][:100]}...")
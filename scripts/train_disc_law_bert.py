@@ -5,10 +5,10 @@
 """
 import os
 import sys
-import asyncio
 import argparse
 import logging
 from datetime import datetime
+from pathlib import Path
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,7 +19,51 @@ from backend.app.services.disc_law_bert import DISCLawBERT, GBALegalDataProcesso
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-async def main():
+# 模型使用说明（README.md）模板
+README_TEMPLATE = """# DISC-LawLLM BERT模型
+
+## 模型信息
+- 模型类型: 基于DISC-LawLLM架构的法律BERT模型
+- 预训练模型: {model_name}
+- 训练数据: 粤港澳大湾区法律数据
+- 类别数量: 10个法律类别
+- 训练时间: {trained_at}
+
+## 训练指标
+{metrics}
+
+## 使用方法
+
+```python
+from backend.app.services.disc_law_bert import DISCLawBERT
+
+# 加载模型
+model = DISCLawBERT.load_model('{output_dir}')
+
+# 预测文本类别
+texts = ["根据合同法规定...", "刑法修正案..."]
+results = model.predict(texts)
+
+for result in results:
+    print(f"文本: {{result['text']}}")
+    print(f"预测类别: {{result['predicted_label']}}")
+    print(f"置信度: {{result['confidence']:.4f}}")
+```
+
+## 法律类别
+1. 民事
+2. 刑事
+3. 行政
+4. 商事
+5. 劳动
+6. 知识产权
+7. 环境
+8. 国际
+9. 金融
+10. 其他
+"""
+
+def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="训练基于DISC-LawLLM架构的BERT模型")
     parser.add_argument("--data_dir", type=str, default="data/disc_law_data",
@@ -109,52 +153,13 @@ async def main():
         
         # 8. 创建模型使用说明
         usage_file = os.path.join(args.output_dir, "README.md")
-        with open(usage_file, 'w', encoding='utf-8') as f:
-            f.write(f"""# DISC-LawLLM BERT模型
-
-## 模型信息
-- 模型类型: 基于DISC-LawLLM架构的法律BERT模型
-- 预训练模型: {args.model_name}
-- 训练数据: 粤港澳大湾区法律数据
-- 类别数量: 10个法律类别
-- 训练时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## 训练指标
-""")
-            for metric, value in metrics.items():
-                f.write(f"- {metric}: {value:.4f}\n")
-            
-            f.write(f"""
-## 使用方法
-
-```python
-from backend.app.services.disc_law_bert import DISCLawBERT
-
-# 加载模型
-model = DISCLawBERT.load_model('{args.output_dir}')
-
-# 预测文本类别
-texts = ["根据合同法规定...", "刑法修正案..."]
-results = model.predict(texts)
-
-for result in results:
-    print(f"文本: {result['text']}")
-    print(f"预测类别: {result['predicted_label']}")
-    print(f"置信度: {result['confidence']:.4f}")
-```
-
-## 法律类别
-1. 民事
-2. 刑事
-3. 行政
-4. 商事
-5. 劳动
-6. 知识产权
-7. 环境
-8. 国际
-9. 金融
-10. 其他
-""")
+        metrics_block = "\n".join(f"- {metric}: {value:.4f}" for metric, value in metrics.items())
+        Path(usage_file).write_text(README_TEMPLATE.format(
+            model_name=args.model_name,
+            trained_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            metrics=metrics_block,
+            output_dir=args.output_dir
+        ), encoding='utf-8')
         
         logger.info(f"📖 使用说明已保存到: {usage_file}")
         
@@ -163,7 +168,7 @@ for result in results:
         raise
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
 
 
 
@@ -4,33 +4,37 @@ AI法律服务生态链系统 - 后端启动脚本
 """
 import os
 import sys
+import importlib.util
 import subprocess
 import time
-from pathlib import Path
+
+from scripts.launcher_utils import uvicorn_command
+
+# 启动前检查的核心依赖
+CORE_DEPENDENCIES = ("fastapi", "uvicorn", "sqlalchemy", "redis")
 
 def check_dependencies():
-    """检查依赖是否安装"""
-    try:
-        import fastapi
-        import uvicorn
-        import sqlalchemy
-        import redis
-        print("✅ 核心依赖已安装")
-        return True
-    except ImportError as e:
-        print(f"❌ 缺少依赖: {e}")
+    """检查依赖是否安装（只查找模块，不执行导入，服务进程会自行导入）"""
+    missing = [name for name in CORE_DEPENDENCIES if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ 缺少依赖: {', '.join(missing)}")
         print("请运行: pip install -r requirements.txt")
         return False
+    print("✅ 核心依赖已安装")
+    return True
 
 def check_database():
     """检查数据库连接"""
     try:
         from app.core.config import settings
-        from sqlalchemy import create_engine
+        from sqlalchemy import create_engine, text
         
         engine = create_engine(settings.DATABASE_URL)
-        with engine.connect() as conn:
-            conn.execute("SELECT 1")
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        finally:
+            engine.dispose()
         print("✅ 数据库连接正常")
         return True
     except Exception as e:
@@ -63,7 +67,9 @@ def create_directories():
     ]
     
     for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+        if os.path.isdir(directory):
+            continue
+        os.makedirs(directory, exist_ok=True)
         print(f"✅ 创建目录: {directory}")
 
 def main():
@@ -91,14 +97,7 @@ def main():
     
     # 启动服务器
     try:
-        os.chdir("backend")
-        subprocess.run([
-            "python", "-m", "uvicorn", 
-            "main:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000", 
-            "--reload"
-        ])
+        subprocess.run(uvicorn_command(), cwd="backend")
     except KeyboardInterrupt:
         print("\n👋 服务器已停止")
     except Exception as e:
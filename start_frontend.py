@@ -2,7 +2,6 @@
 """
 AI法律服务生态链系统 - 前端启动脚本
 """
-import os
 import sys
 import subprocess
 import time
@@ -11,26 +10,28 @@ from pathlib import Path
 def check_node():
     """检查Node.js是否安装"""
     try:
-        result = subprocess.run(["node", "--version"], capture_output=True, text=True)
+        result = subprocess.run(["node", "--version"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, timeout=5)
         if result.returncode == 0:
             print(f"✅ Node.js版本: {result.stdout.strip()}")
             return True
         else:
             print("❌ Node.js未安装")
             return False
-    except FileNotFoundError:
+    except (FileNotFoundError, subprocess.TimeoutExpired):
         print("❌ Node.js未安装")
         return False
 
 def check_npm():
     """检查npm是否安装"""
     try:
-        result = subprocess.run(["npm", "--version"], capture_output=True, text=True)
+        result = subprocess.run(["npm", "--version"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, timeout=5)
         if result.returncode == 0:
             print(f"✅ npm版本: {result.stdout.strip()}")
             return True
         else:
-            print(f"❌ npm检查失败: {result.stderr}")
+            print(f"❌ npm检查失败: 退出码 {result.returncode}")
             return False
     except FileNotFoundError:
         print("❌ npm未找到，请检查PATH环境变量")
@@ -79,8 +80,7 @@ def main():
     
     # 启动前端服务器
     try:
-        os.chdir("frontend")
-        subprocess.run(["npm", "start"])
+        subprocess.run(["npm", "start"], cwd="frontend")
     except KeyboardInterrupt:
         print("\n👋 前端服务器已停止")
     except Exception as e: